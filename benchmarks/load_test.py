@@ -0,0 +1,306 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import llm_client  # noqa: E402
+from quiz_bank import load_quiz_bank  # noqa: E402
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+# 부하 테스트 (AppTest로 참가자 N명의 전체 과정을 실행)
+# 프로필 설정 → 사전 퀴즈 → 정보 페이지 → 사후 퀴즈 → 질문하기 순서로 진행하며,
+# OpenAI 호출은 실제 API 대신 아래의 StubOpenAI가 응답합니다.
+# (--base-url을 주면 benchmarks/mock_openai.py 같은 OpenAI 호환 서버로 실제 HTTP 요청을 보냅니다)
+# 한 프로세스에서 모든 참가자의 단계를 번갈아 실행하므로 서버 한 대가 캐시와 저장소를 공유하는 상황과 같고,
+# 재실행 지연 시간은 스크립트 실행 시간(브라우저 전송 제외)입니다.
+# 사용법: python benchmarks/load_test.py --users 50 [--output result.json] [--compare baseline.json]
+
+APP_PATH = os.path.join(REPO_DIR, "consent.py")
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+QUESTIONS = [
+    "로봇수술의 장점은 무엇인가요?",
+    "로봇수술 후 회복 기간은 얼마나 걸리나요?",
+    "로봇수술의 부작용은 어떤 것이 있나요?",
+    "로봇수술 비용은 얼마인가요?",
+    "수술 동의서에 서명하면 취소할 수 없나요?",
+]
+ANSWER_TEXT = "로봇수술은 작은 절개로 진행되어 회복이 빠른 편입니다. 자세한 내용은 담당 의료진과 상담하세요."
+# 대기열이 가득 차 질문이 거절될 때 앱이 띄우는 경고 (consent.py의 QueueFull 처리)
+QUEUE_FULL_WARNING = "질문하시는 분이 많아"
+
+
+# OpenAI 클라이언트 대체 (스트리밍 응답과 임베딩만 흉내 냄)
+class StubOpenAI:
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._chat))
+        self.embeddings = types.SimpleNamespace(create=self._embedding)
+
+    def _chat(self, stream=False, **kwargs):
+        time.sleep(self.latency)
+        tokens = ANSWER_TEXT.split(" ")
+        if not stream:
+            message = types.SimpleNamespace(content=ANSWER_TEXT)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        return iter(
+            types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=token + " "))])
+            for token in tokens
+        )
+
+    # 같은 문장에는 항상 같은 벡터를 돌려줌 (답변 캐시 적중을 재현)
+    def _embedding(self, input, **kwargs):
+        time.sleep(self.latency / 4)
+        texts = [input] if isinstance(input, str) else input
+        data = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(256)
+            data.append(types.SimpleNamespace(embedding=(vector / np.linalg.norm(vector)).tolist()))
+        return types.SimpleNamespace(data=data)
+
+
+# st.rerun()으로 다시 실행되면 브라우저처럼 중단된 실행의 요소를 버림
+# (AppTest는 두 실행의 요소를 합쳐 보관하므로, 다음 섹션의 문항 수가 적으면 이전 섹션 문항이 남음)
+def discard_interrupted_runs():
+    original_init = LocalScriptRunner.__init__
+
+    def init(runner, *args, **kwargs):
+        original_init(runner, *args, **kwargs)
+
+        def on_event(sender, event, **event_kwargs):
+            if event == ScriptRunnerEvent.SCRIPT_STARTED:
+                runner.forward_msg_queue.clear()
+
+        runner.on_event.connect(on_event, weak=False)
+
+    LocalScriptRunner.__init__ = init
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# 참가자 한 명의 단계 목록: (단계 이름, 재실행 전에 할 동작)
+def journey_steps(at, sections, rng):
+    def choose_profile():
+        for selectbox in at.selectbox:
+            selectbox.set_value(rng.choice(selectbox.options))
+        at.button(key="profile_submit").click()
+
+    def answer(key):
+        radio = at.radio(key=key)
+        radio.set_value(rng.choice(radio.options))
+
+    steps = [("첫 화면", lambda: None), ("프로필 제출", choose_profile)]
+    for quiz_name, answer_prefix, button_prefix, submit_key in (
+        ("사전 퀴즈", "q", "", "pre_quiz_submit"),
+        ("사후 퀴즈", "pq", "post_", "post_quiz_submit"),
+    ):
+        if quiz_name == "사후 퀴즈":
+            steps.append(("정보 페이지", lambda: at.button(key="nav_info").click()))
+            steps.append(("사후 퀴즈 이동", lambda: at.button(key="nav_post_quiz").click()))
+        for number, section in enumerate(sections, start=1):
+            for question in section["questions"]:
+                key = f"{answer_prefix}{question['id']}"
+                steps.append((f"{quiz_name} 답변", lambda key=key: answer(key)))
+            if number < len(sections):
+                button_key = f"next_{button_prefix}section{number}"
+                steps.append((f"{quiz_name} 섹션 이동", lambda key=button_key: at.button(key=key).click()))
+            else:
+                steps.append((f"{quiz_name} 제출", lambda key=submit_key: at.button(key=key).click()))
+    steps.append(("질문 페이지", lambda: at.button(key="nav_chat").click()))
+    for question in rng.sample(QUESTIONS, 2):
+        steps.append(("질문", lambda question=question: at.chat_input[0].set_value(question)))
+    return steps
+
+
+# 재실행 결과가 실패인지 확인: 예외, st.error, 대기열 거절 경고 중 하나라도 있으면 그 내용 반환
+def step_failure(at):
+    if at.exception:
+        return at.exception[0].message
+    if at.error:
+        return at.error[0].value
+    for warning in at.warning:
+        if QUEUE_FULL_WARNING in warning.value:
+            return warning.value
+    return None
+
+
+def summarize(durations):
+    values = np.asarray(durations) * 1000
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 2),
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "p99": round(float(np.percentile(values, 99)), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+# 참가자 N명을 만들고 각자의 단계를 한 단계씩 번갈아 실행
+def run_load_test(app_path, users, seed, timeout):
+    sections = load_quiz_bank()["sections"]
+    rng = random.Random(seed)
+
+    # 캐시 준비용 참가자 1명 (측정에서 제외)
+    warmup = AppTest.from_file(app_path, default_timeout=timeout)
+    warmup.secrets["OPENAI_API_KEY"] = "sk-load-test"
+    for _, action in journey_steps(warmup, sections, random.Random(seed)):
+        action()
+        warmup.run()
+    del warmup
+
+    rss_start = current_rss_mb()
+    sessions = []
+    for _ in range(users):
+        at = AppTest.from_file(app_path, default_timeout=timeout)
+        at.secrets["OPENAI_API_KEY"] = "sk-load-test"
+        sessions.append((at, iter(journey_steps(at, sections, random.Random(rng.random())))))
+
+    timings = {}
+    errors = []
+    # 실패한 단계에서 참가자의 여정을 멈추므로 참가자당 한 번만 실패로 셈
+    failed_users = set()
+    start = time.perf_counter()
+    active = list(enumerate(sessions))
+    while active:
+        still_active = []
+        for user, (at, steps) in active:
+            step = next(steps, None)
+            if step is None:
+                continue
+            name, action = step
+            try:
+                action()
+                step_start = time.perf_counter()
+                at.run()
+                elapsed = time.perf_counter() - step_start
+                failure = step_failure(at)
+            except Exception as e:
+                failure = str(e)
+            if failure is not None:
+                errors.append(f"{name}: {failure}")
+                failed_users.add(user)
+                continue
+            timings.setdefault(name, []).append(elapsed)
+            still_active.append((user, (at, steps)))
+        active = still_active
+    wall = time.perf_counter() - start
+    rss_end = current_rss_mb()
+
+    all_durations = [duration for durations in timings.values() for duration in durations]
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "app": os.path.relpath(app_path, REPO_DIR),
+        "users": users,
+        "seed": seed,
+        "llm_latency": StubOpenAI.latency,
+        "base_url": os.environ.get("OPENAI_BASE_URL"),
+        "wall_seconds": round(wall, 2),
+        "reruns": len(all_durations),
+        "failed_journeys": len(failed_users),
+        "throughput": {
+            "reruns_per_second": round(len(all_durations) / wall, 2),
+            "journeys_per_minute": round((users - len(failed_users)) / wall * 60, 2),
+        },
+        "latency_ms": {
+            "all": summarize(all_durations) if all_durations else None,
+            "steps": {name: summarize(durations) for name, durations in timings.items()},
+        },
+        # AppTest가 보관하는 화면 트리까지 포함하므로 실제 서버보다 크게 측정됩니다
+        "memory": {
+            "rss_start_mb": round(rss_start, 1),
+            "rss_end_mb": round(rss_end, 1),
+            "per_session_kb": round((rss_end - rss_start) * 1024 / users, 1),
+        },
+        "errors": errors,
+    }
+
+
+def print_result(result, baseline=None):
+    def compare(new, old):
+        if old is None:
+            return f"{new:9.1f}"
+        return f"{new:9.1f} ({(new - old) / old * 100:+.0f}%)" if old else f"{new:9.1f}"
+
+    old_steps = baseline["latency_ms"]["steps"] if baseline else {}
+    print(f"참가자 {result['users']}명, 재실행 {result['reruns']}회, {result['wall_seconds']}초")
+    print(f"{'단계':<16}{'횟수':>6}{'p50 (ms)':>18}{'p95 (ms)':>18}{'p99 (ms)':>18}")
+    rows = list(result["latency_ms"]["steps"].items()) + [("전체", result["latency_ms"]["all"])]
+    for name, stats in rows:
+        old = old_steps.get(name) if name != "전체" else (baseline["latency_ms"]["all"] if baseline else None)
+        print(f"{name:<16}{stats['count']:>6}"
+              f"{compare(stats['p50'], old and old['p50']):>18}"
+              f"{compare(stats['p95'], old and old['p95']):>18}"
+              f"{compare(stats['p99'], old and old['p99']):>18}")
+    throughput = result["throughput"]
+    old_throughput = baseline["throughput"] if baseline else {}
+    print(f"처리량: 초당 재실행 {compare(throughput['reruns_per_second'], old_throughput.get('reruns_per_second')).strip()}, "
+          f"분당 완료 {compare(throughput['journeys_per_minute'], old_throughput.get('journeys_per_minute')).strip()}")
+    print(f"세션당 메모리: {result['memory']['per_session_kb']} KB")
+    if result["errors"]:
+        print(f"오류 {len(result['errors'])}건 (실패한 참가자 {result['failed_journeys']}명): {result['errors'][:3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="참가자 N명의 전체 과정을 실행하여 재실행 지연 시간과 처리량을 측정합니다.")
+    parser.add_argument("--app", default=APP_PATH, help="측정할 앱 파일 (기본값: consent.py)")
+    parser.add_argument("--users", type=int, default=20, help="참가자 수 (기본값: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="답변 선택용 난수 시드")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="가짜 OpenAI 응답 지연 (초)")
+    parser.add_argument("--base-url", help="StubOpenAI 대신 사용할 OpenAI 호환 서버 주소 (예: http://localhost:8001/v1)")
+    parser.add_argument("--timeout", type=float, default=60, help="재실행당 제한 시간 (초)")
+    parser.add_argument("--output", help="결과 JSON 파일 (기본값: benchmarks/results/load_<시각>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args()
+
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    else:
+        StubOpenAI.latency = args.llm_latency
+        llm_client.OpenAI = StubOpenAI
+    discard_interrupted_runs()
+
+    app_path = os.path.abspath(args.app)
+    os.chdir(os.path.dirname(app_path))
+    db_dir = tempfile.TemporaryDirectory()
+    os.environ["CONSENT_DB_PATH"] = os.path.join(db_dir.name, "participants.db")
+    os.environ["CONSENT_EVENT_LOG_DIR"] = os.path.join(db_dir.name, "events")
+
+    result = run_load_test(app_path, args.users, args.seed, args.timeout)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+    print(f"결과 저장: {output}")
+
+
+if __name__ == "__main__":
+    main()
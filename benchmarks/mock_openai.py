@@ -0,0 +1,367 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# OpenAI 호환 로컬 모의 서버 (성능 측정과 오프라인 테스트용)
+# /v1/chat/completions(스트리밍/일반)와 /v1/embeddings를 흉내 내며,
+# 응답 지연 분포, 오류 주입(429/500/시간 초과), 기록된 응답 재생을 지원합니다.
+# 사용법:
+#   python benchmarks/mock_openai.py --port 8001 --latency lognormal:-1.5,0.5 --error-rate 0.02
+#   OPENAI_BASE_URL=http://localhost:8001/v1 streamlit run consent.py
+#   (API 키는 .streamlit/secrets.toml의 OPENAI_API_KEY, 모의 서버는 아무 값이나 허용)
+#   (네트워크 없이 실행하면 토큰 수는 글자 수 근사치로 계산됩니다. 정확한 값이 필요하면 인터넷이 되는 곳에서
+#    TIKTOKEN_CACHE_DIR=<폴더> python -c "import tiktoken; tiktoken.get_encoding('cl100k_base')" 로 미리 받아 두고
+#    같은 TIKTOKEN_CACHE_DIR를 지정해 실행하세요.)
+# 실제 응답 기록: --record recordings.jsonl --upstream https://api.openai.com/v1 (OPENAI_API_KEY 필요)
+# 기록 재생: --replay recordings.jsonl
+
+DEFAULT_ANSWER = (
+    "로봇수술은 작은 절개로 진행되어 출혈과 통증이 적고 회복이 빠른 편입니다. "
+    "다만 환자의 상태에 따라 적합한 수술 방법이 다를 수 있으니 담당 의료진과 충분히 상담하세요."
+)
+
+
+# 지연 시간 분포: "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.05", "lognormal:-1.5,0.5" (초 단위)
+class LatencyDistribution:
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"지원하지 않는 분포입니다: {kind} (가능: {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",")] if params else [0.0]
+        self.spec = spec
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(self.params[0], self.params[1])
+        else:
+            value = rng.lognormvariate(self.params[0], self.params[1])
+        return max(0.0, value)
+
+
+# 재생용 요청 키 (모델과 입력만 사용, temperature 등은 무시)
+def request_key(endpoint, body):
+    payload = {"endpoint": endpoint, "model": body.get("model")}
+    if endpoint == "chat.completions":
+        payload["messages"] = body.get("messages")
+    else:
+        payload["input"] = body.get("input")
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# 같은 입력에는 항상 같은 단위 벡터
+def deterministic_embedding(text, dimensions):
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def count_tokens(text):
+    return max(1, len(text) // 2)
+
+
+class MockOpenAI:
+    def __init__(self, latency="fixed:0", token_interval="fixed:0", error_rate=0.0, errors=("429", "500"),
+                 retry_after=1.0, timeout_delay=120.0, embedding_dim=1536, answer=DEFAULT_ANSWER,
+                 replay=None, record=None, upstream=None, upstream_key=None, seed=0):
+        self.latency = LatencyDistribution(latency)
+        self.token_interval = LatencyDistribution(token_interval)
+        self.error_rate = error_rate
+        self.errors = list(errors)
+        self.retry_after = retry_after
+        self.timeout_delay = timeout_delay
+        self.embedding_dim = embedding_dim
+        self.answer = answer
+        self.record_path = record
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.upstream_key = upstream_key
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.recordings = {}
+        if replay:
+            with open(replay, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["key"]] = entry["response"]
+        self.stats = {"requests": 0, "streamed": 0, "replayed": 0, "recorded": 0, "errors": {}}
+
+    def _random(self, method, *args):
+        with self._lock:
+            return getattr(self._rng, method)(*args)
+
+    def sample_latency(self, distribution):
+        with self._lock:
+            return distribution.sample(self._rng)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def count_error(self, error):
+        with self._lock:
+            self.stats["errors"][error] = self.stats["errors"].get(error, 0) + 1
+
+    # 주입할 오류 선택 (없으면 None)
+    def pick_error(self):
+        if self.error_rate <= 0 or self._random("random") >= self.error_rate:
+            return None
+        return self._random("choice", self.errors)
+
+    # 채팅 응답 본문 (일반 응답 형식, 스트리밍은 이 내용을 나눠 전송)
+    def chat_response(self, body):
+        key = request_key("chat.completions", body)
+        if key in self.recordings:
+            self.count("replayed")
+            return self.recordings[key]
+        if self.upstream:
+            return self._record(key, "chat/completions", {**body, "stream": False})
+        completion = self.answer
+        prompt_tokens = count_tokens(json.dumps(body.get("messages", []), ensure_ascii=False))
+        return {
+            "id": f"chatcmpl-mock-{key[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": completion}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": count_tokens(completion),
+                "total_tokens": prompt_tokens + count_tokens(completion),
+            },
+        }
+
+    def embedding_response(self, body):
+        key = request_key("embeddings", body)
+        if key in self.recordings:
+            self.count("replayed")
+            return self.recordings[key]
+        if self.upstream:
+            return self._record(key, "embeddings", {**body, "encoding_format": "float"})
+        inputs = body.get("input", [])
+        inputs = [str(text) for text in ([inputs] if isinstance(inputs, str) else inputs)]
+        dimensions = body.get("dimensions") or self.embedding_dim
+        prompt_tokens = sum(count_tokens(text) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "mock"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": deterministic_embedding(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    # 실제 API에 요청을 보내고 응답을 기록 파일에 추가
+    def _record(self, key, path, body):
+        import httpx
+
+        response = httpx.post(
+            f"{self.upstream}/{path}",
+            json=body,
+            headers={"Authorization": f"Bearer {self.upstream_key}"},
+            timeout=60
+        )
+        response.raise_for_status()
+        data = response.json()
+        with self._lock:
+            self.recordings[key] = data
+            if self.record_path:
+                with open(self.record_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "endpoint": path, "request": body, "response": data},
+                                       ensure_ascii=False) + "\n")
+        self.count("recorded")
+        return data
+
+
+# 스트리밍 조각: 공백 기준으로 나눈 단어 (띄어쓰기 포함)
+def split_stream_pieces(text):
+    words = text.split(" ")
+    return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+
+def encode_embeddings_base64(response):
+    data = []
+    for item in response["data"]:
+        vector = item["embedding"]
+        packed = struct.pack(f"<{len(vector)}f", *vector)
+        data.append({**item, "embedding": base64.b64encode(packed).decode("ascii")})
+    return {**response, "data": data}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/stats", "/v1/stats"):
+            self._send_json(200, self.mock.stats)
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+        self.mock.count("requests")
+
+        error = self.mock.pick_error()
+        if error is not None:
+            self.mock.count_error(error)
+            self._send_error(error)
+            return
+
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        elif path.endswith("/embeddings"):
+            time.sleep(self.mock.sample_latency(self.mock.latency))
+            response = self.mock.embedding_response(body)
+            if body.get("encoding_format") == "base64":
+                response = encode_embeddings_base64(response)
+            self._send_json(200, response)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _chat(self, body):
+        first_token_delay = self.mock.sample_latency(self.mock.latency)
+        response = self.mock.chat_response(body)
+        content = response["choices"][0]["message"]["content"] or ""
+
+        if not body.get("stream"):
+            pieces = split_stream_pieces(content)
+            time.sleep(first_token_delay + sum(self.mock.sample_latency(self.mock.token_interval) for _ in pieces))
+            self._send_json(200, response)
+            return
+
+        self.mock.count("streamed")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        base = {"id": response["id"], "object": "chat.completion.chunk",
+                "created": response.get("created", int(time.time())), "model": response.get("model", "mock")}
+        time.sleep(first_token_delay)
+        self._send_event({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                               "finish_reason": None}]})
+        for i, piece in enumerate(split_stream_pieces(content)):
+            if i:
+                time.sleep(self.mock.sample_latency(self.mock.token_interval))
+            self._send_event({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({**base, "choices": [], "usage": response.get("usage")})
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_event(self, payload):
+        self._send_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, error):
+        if error == "timeout":
+            # 응답 없이 기다리다 연결을 끊음 (클라이언트 시간 초과 재현)
+            time.sleep(self.mock.timeout_delay)
+            self.close_connection = True
+            return
+        if error == "429":
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                            "code": "rate_limit_exceeded"}},
+                            headers={"Retry-After": str(self.mock.retry_after)})
+        else:
+            self._send_json(int(error), {"error": {"message": "The server had an error (mock)",
+                                                   "type": "server_error"}})
+
+
+def create_server(mock, host="127.0.0.1", port=8001):
+    handler = type("BoundMockHandler", (MockHandler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 로컬 모의 서버를 실행합니다.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="fixed:0", help="첫 토큰(일반 응답은 시작)까지의 지연 분포 (예: lognormal:-1.5,0.5)")
+    parser.add_argument("--token-interval", default="fixed:0", help="스트리밍 조각 사이의 지연 분포 (예: uniform:0.01,0.03)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류를 주입할 요청 비율 (0~1)")
+    parser.add_argument("--errors", default="429,500", help="주입할 오류 종류: 429, 500, 502, 503, timeout")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 응답의 Retry-After (초)")
+    parser.add_argument("--timeout-delay", type=float, default=120.0, help="timeout 오류에서 연결을 끊기 전 대기 시간 (초)")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--replay", help="재생할 기록 파일 (JSONL)")
+    parser.add_argument("--record", help="실제 API 응답을 기록할 파일 (--upstream 필요)")
+    parser.add_argument("--upstream", help="기록할 때 요청을 보낼 실제 API 주소 (예: https://api.openai.com/v1)")
+    parser.add_argument("--seed", type=int, default=0, help="지연·오류 주입용 난수 시드")
+    args = parser.parse_args()
+
+    if args.record and not args.upstream:
+        parser.error("--record에는 --upstream이 필요합니다.")
+    upstream_key = None
+    if args.upstream:
+        upstream_key = os.environ.get("OPENAI_API_KEY")
+        if not upstream_key:
+            parser.error("--upstream을 사용하려면 OPENAI_API_KEY 환경 변수가 필요합니다.")
+
+    mock = MockOpenAI(
+        latency=args.latency,
+        token_interval=args.token_interval,
+        error_rate=args.error_rate,
+        errors=[error.strip() for error in args.errors.split(",") if error.strip()],
+        retry_after=args.retry_after,
+        timeout_delay=args.timeout_delay,
+        embedding_dim=args.embedding_dim,
+        replay=args.replay,
+        record=args.record,
+        upstream=args.upstream,
+        upstream_key=upstream_key,
+        seed=args.seed
+    )
+    server = create_server(mock, args.host, args.port)
+    print(f"모의 OpenAI 서버: http://{args.host}:{args.port}/v1 (기록 {len(mock.recordings)}개)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import tempfile
+
+from streamlit.runtime.forward_msg_cache import populate_hash_if_needed
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+from streamlit.testing.v1 import AppTest
+
+# 재실행(rerun)마다 브라우저로 보내는 데이터 크기 측정
+# 브라우저의 메시지 캐시를 흉내 내어, 이미 받은 큰 요소는 해시 참조 크기만 계산합니다.
+# 사용법: python benchmarks/rerun_bytes.py [--app consent.py]
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "consent.py")
+
+
+class ByteCounter:
+    def __init__(self):
+        self.client_cache = set()
+        self.bytes = 0
+        self.messages = 0
+
+    def install(self):
+        original_enqueue = ScriptRunContext.enqueue
+        counter = self
+
+        def enqueue(ctx, msg):
+            ctx.cached_message_hashes = counter.client_cache
+            real_enqueue = ctx._enqueue
+
+            def counting_enqueue(sent):
+                counter.bytes += sent.ByteSize()
+                counter.messages += 1
+                return real_enqueue(sent)
+
+            ctx._enqueue = counting_enqueue
+            try:
+                original_enqueue(ctx, msg)
+            finally:
+                ctx._enqueue = real_enqueue
+            populate_hash_if_needed(msg)
+            if msg.metadata.cacheable:
+                counter.client_cache.add(msg.hash)
+
+        ScriptRunContext.enqueue = enqueue
+
+    def take(self):
+        result = (self.bytes, self.messages)
+        self.bytes = 0
+        self.messages = 0
+        return result
+
+
+def answer_all(at):
+    for radio in at.radio:
+        radio.set_value(radio.options[0])
+
+
+# 프로필 설정 → 사전 퀴즈 3개 섹션 → 메인 → 정보 페이지
+def run_journey(app_path):
+    at = AppTest.from_file(app_path, default_timeout=60)
+    at.secrets["OPENAI_API_KEY"] = "sk-benchmark"
+    steps = [
+        ("첫 화면", lambda: None),
+        ("프로필 제출", lambda: at.button(key="profile_submit").click()),
+        ("사전 퀴즈 1 답변", lambda: answer_all(at)),
+        ("다음 섹션", lambda: at.button(key="next_section1").click()),
+        ("사전 퀴즈 2 답변", lambda: answer_all(at)),
+        ("다음 섹션", lambda: at.button(key="next_section2").click()),
+        ("사전 퀴즈 3 답변", lambda: answer_all(at)),
+        ("퀴즈 제출", lambda: at.button(key="pre_quiz_submit").click()),
+        ("정보 페이지", lambda: at.button(key="nav_info").click()),
+    ]
+    for name, action in steps:
+        action()
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        yield name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재실행마다 전송되는 데이터 크기를 측정합니다.")
+    parser.add_argument("--app", default=APP_PATH, help="측정할 앱 파일 (기본값: consent.py)")
+    args = parser.parse_args()
+
+    # 측정용 참가자 기록과 이벤트 로그가 실제 데이터에 섞이지 않도록 임시 폴더 사용
+    # (저장소가 종료 시점에 남은 기록을 쓰므로 실행 중에 지우지 않는 mkdtemp 사용)
+    data_dir = tempfile.mkdtemp()
+    os.environ["CONSENT_DB_PATH"] = os.path.join(data_dir, "participants.db")
+    os.environ["CONSENT_EVENT_LOG_DIR"] = os.path.join(data_dir, "events")
+    os.chdir(os.path.dirname(os.path.abspath(args.app)))
+
+    counter = ByteCounter()
+    counter.install()
+    total = 0
+    for name in run_journey(os.path.abspath(args.app)):
+        sent, messages = counter.take()
+        total += sent
+        print(f"{name:<14} {sent / 1024:8.1f} KB  ({messages}개 메시지)")
+    print(f"{'합계':<14} {total / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+# 재실행(rerun) 시간 측정
+# 실제 streamlit 서버를 띄우고 브라우저처럼 웹소켓으로 위젯 값을 보내,
+# 사전 퀴즈 10문항에 하나씩 답할 때마다 재실행이 끝날 때까지 걸린 시간을 잽니다.
+# (AppTest는 매 실행마다 새 세션을 만들어 fragment 단위 재실행을 재현하지 못합니다.)
+# 사용법: python benchmarks/rerun_time.py [--app consent.py] [--rounds 5]
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "consent.py")
+NEXT_BUTTONS = ["next_section1", "next_section2"]
+
+FINISHED = (
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+# 참가자 DB와 이벤트 로그는 data_dir에 기록 (실제 data/ 폴더에 측정용 참가자가 남지 않도록)
+def start_server(app_path, port, data_dir):
+    env = dict(
+        os.environ,
+        CONSENT_DB_PATH=os.path.join(data_dir, "participants.db"),
+        CONSENT_EVENT_LOG_DIR=os.path.join(data_dir, "events")
+    )
+    # 앱은 API 키를 Streamlit secrets에서만 읽으므로 측정용 secrets 파일을 따로 지정
+    secrets_path = os.path.join(data_dir, "secrets.toml")
+    with open(secrets_path, "w", encoding="utf-8") as f:
+        f.write('OPENAI_API_KEY = "sk-benchmark"\n')
+    command = [
+        sys.executable, "-m", "streamlit", "run", os.path.abspath(app_path),
+        "--secrets.files", secrets_path,
+        "--server.headless", "true",
+        "--server.port", str(port),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    server = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(app_path)), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("streamlit 서버가 시작되지 않았습니다.")
+
+
+# 브라우저 한 탭처럼 위젯 값을 기억해 두었다가 재실행 요청에 함께 보냄
+class BrowserSession:
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}
+        self.values = {}
+
+    @classmethod
+    async def connect(cls, port):
+        connection = await websocket_connect(f"ws://localhost:{port}/_stcore/stream", subprotocols=["streamlit"])
+        return cls(connection)
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        msg = BackMsg()
+        msg.rerun_script.fragment_id = fragment_id
+        for widget_id, (field, value) in self.values.items():
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        if trigger is not None:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+
+        start = time.perf_counter()
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+        received = 0
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise RuntimeError("서버와의 연결이 끊어졌습니다.")
+            received += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            self._record(forward)
+            if forward.WhichOneof("type") == "script_finished" and forward.script_finished in FINISHED:
+                return time.perf_counter() - start, received
+
+    def _record(self, forward):
+        if forward.WhichOneof("type") != "delta" or forward.delta.WhichOneof("type") != "new_element":
+            return
+        element = forward.delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            raise RuntimeError(f"앱 실행 중 예외: {element.exception.message}")
+        widget_id = getattr(getattr(element, kind), "id", "")
+        if widget_id:
+            # 위젯 ID는 "...-<key>" 형식이므로 key로 찾을 수 있도록 저장
+            self.widgets[widget_id.rsplit("-", 1)[-1]] = (widget_id, forward.delta.fragment_id)
+
+    async def click(self, key):
+        widget_id, fragment_id = self.widgets[key]
+        return await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+
+    async def choose(self, key, index):
+        widget_id, fragment_id = self.widgets[key]
+        self.values[widget_id] = ("int_value", index)
+        return await self.rerun(fragment_id=fragment_id)
+
+
+# 프로필 설정 후 사전 퀴즈 10문항을 한 문항씩 답하고 섹션을 넘김
+async def quiz_pass(port):
+    session = await BrowserSession.connect(port)
+    try:
+        await session.rerun()
+        await session.click("profile_submit")
+        timings = []
+        question_id = 1
+        for next_button in NEXT_BUTTONS + [None]:
+            while f"q{question_id}" in session.widgets:
+                timings.append(await session.choose(f"q{question_id}", 0))
+                question_id += 1
+            if next_button is not None:
+                await session.click(next_button)
+        return timings
+    finally:
+        session.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사전 퀴즈 10문항에 답할 때의 재실행 시간을 측정합니다.")
+    parser.add_argument("--app", default=APP_PATH, help="측정할 앱 파일 (기본값: consent.py)")
+    parser.add_argument("--rounds", type=int, default=5, help="반복 횟수 (기본값: 5)")
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(args.app, port, tmp)
+        try:
+            asyncio.run(quiz_pass(port))  # 캐시 준비용 1회
+            timings = []
+            for _ in range(args.rounds):
+                timings.extend(asyncio.run(quiz_pass(port)))
+        finally:
+            server.terminate()
+            server.wait()
+
+    seconds = sorted(t for t, _ in timings)
+    received = [size for _, size in timings]
+    print(f"답변 재실행 {len(seconds)}회")
+    print(f"  중앙값 {statistics.median(seconds) * 1000:.1f} ms, "
+          f"p90 {seconds[int(len(seconds) * 0.9) - 1] * 1000:.1f} ms, "
+          f"평균 {statistics.mean(seconds) * 1000:.1f} ms")
+    print(f"  재실행당 수신 {statistics.mean(received) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
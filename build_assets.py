@@ -0,0 +1,66 @@
+import argparse
+import os
+
+import requests
+from PIL import Image
+
+# 이미지 최적화 (배포 전 실행)
+# 화면에 표시되는 크기에 맞춘 PNG 파일을 images/dist에 만듭니다.
+# st.image는 표시 너비보다 큰 이미지나 출력 형식과 다른 이미지를 매번 다시 변환하므로,
+# 앱에서는 표시 너비와 같은 PNG를 output_format="PNG"로 그대로 사용합니다.
+# 사용법: python build_assets.py
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+DIST_DIR = os.path.join(IMAGES_DIR, "dist")
+
+# 이름: (원본 경로 또는 URL, 표시 너비)
+ASSETS = {
+    "robot_doctor_logo": ("robot_doctor_logo.png", 200),
+    "main_page": ("https://i.imgur.com/g8o2p1f.png", 600),
+}
+
+
+def variant_path(name, width, ext):
+    return os.path.join(DIST_DIR, f"{name}_{width}.{ext}")
+
+
+# 원격 이미지는 images/ 폴더에 한 번만 내려받아 보관
+def fetch_source(name, source):
+    if not source.startswith("http"):
+        return os.path.join(IMAGES_DIR, source)
+    local_path = os.path.join(IMAGES_DIR, f"{name}{os.path.splitext(source)[1]}")
+    if not os.path.exists(local_path):
+        response = requests.get(source, timeout=30)
+        response.raise_for_status()
+        with open(local_path, "wb") as f:
+            f.write(response.content)
+    return local_path
+
+
+def build_asset(name, source, display_width):
+    image = Image.open(fetch_source(name, source))
+    image.load()
+    width = min(display_width, image.width)
+    height = round(image.height * width / image.width)
+    resized = image.resize((width, height), Image.LANCZOS)
+    path = variant_path(name, display_width, "png")
+    resized.save(path, "PNG", optimize=True)
+    print(f"{name}_{display_width}.png: {os.path.getsize(path) / 1024:.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="표시 크기에 맞춘 이미지 파일을 생성합니다.")
+    parser.add_argument("names", nargs="*", help="생성할 이미지 이름 (기본값: 전체)")
+    args = parser.parse_args()
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    for name in args.names or ASSETS:
+        source, display_width = ASSETS[name]
+        try:
+            build_asset(name, source, display_width)
+        except (OSError, requests.RequestException) as e:
+            print(f"{name}: 생성 실패 ({e})")
+
+
+if __name__ == "__main__":
+    main()
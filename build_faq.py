@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+
+from faq import FAQ_PATH, load_faq, write_faq_index
+from llm_client import LLMClient
+from retrieval import ShardedRetrievalIndex, embed_texts
+
+# 자주 묻는 질문 답변 생성 및 색인 (오프라인 실행)
+# 사용법: python build_faq.py --output index/
+# 1. faq.json에서 답변이 없는 항목은 동의서 문단을 참고해 답변을 생성하고 "reviewed": false로 기록합니다.
+# 2. 의료진이 faq.json의 답변을 검토·수정한 뒤 "reviewed": true로 바꿉니다.
+# 3. 다시 실행하면 검토된 항목의 질문만 임베딩하여 앱이 사용할 인덱스를 만듭니다.
+
+SYSTEM_PROMPT = (
+    "당신은 로봇수술 전문 상담사입니다. 환자가 자주 묻는 질문에 대해 "
+    "제공된 동의서 내용을 바탕으로 쉽고 정확하게 3~4문장으로 답변해 주세요."
+)
+
+
+def generate_answer(client, question, passages):
+    context = "\n\n".join(f"[{passage['source']} {passage['page']}쪽] {passage['text']}" for passage in passages)
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        messages.append({"role": "system", "content": f"동의서 내용:\n{context}"})
+    messages.append({"role": "user", "content": question})
+    response = client.chat_completion(model="gpt-3.5-turbo", messages=messages, max_tokens=500, temperature=0.2)
+    return response.choices[0].message.content.strip()
+
+
+# 답변이 없는 항목의 답변 생성 (생성한 항목 수 반환)
+def fill_missing_answers(client, faq, retrieval_index):
+    generated = 0
+    for entry in faq["entries"]:
+        if entry.get("answer"):
+            continue
+        question = entry["questions"][0]
+        passages = []
+        if retrieval_index is not None:
+            passages = retrieval_index.search(embed_texts(client, [question])[0], top_k=3)
+        entry["answer"] = generate_answer(client, question, passages)
+        entry["reviewed"] = False
+        generated += 1
+        print(f"{entry['id']}: 답변 생성 (검토 필요)")
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="자주 묻는 질문의 답변을 생성하고 검색 인덱스를 만듭니다.")
+    parser.add_argument("--faq", default=FAQ_PATH, help="질문 목록 파일 (기본값: faq.json)")
+    parser.add_argument("--output", default="index", help="인덱스를 저장할 폴더 (기본값: index)")
+    parser.add_argument("--consent-index", default="index", help="답변 생성 시 참고할 동의서 인덱스 폴더")
+    parser.add_argument("--include-unreviewed", action="store_true", help="검토되지 않은 답변도 인덱스에 포함")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = LLMClient(os.environ["OPENAI_API_KEY"])
+
+    faq = load_faq(args.faq)
+    if fill_missing_answers(client, faq, ShardedRetrievalIndex.load(args.consent_index)):
+        with open(args.faq, "w", encoding="utf-8") as f:
+            json.dump(faq, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"생성한 답변을 {args.faq}에 기록했습니다. 검토 후 \"reviewed\": true로 바꿔 주세요.")
+
+    entries = [
+        {"id": entry["id"], "questions": entry["questions"], "answer": entry["answer"]}
+        for entry in faq["entries"]
+        if entry.get("reviewed") or args.include_unreviewed
+    ]
+    if not entries:
+        parser.error("인덱스에 넣을 검토된 답변이 없습니다.")
+
+    vectors = embed_texts(client, [question for entry in entries for question in entry["questions"]])
+    write_faq_index(vectors, entries, args.output)
+    print(f"{len(entries)}개 항목({len(vectors)}개 질문)을 {args.output}에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
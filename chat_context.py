@@ -0,0 +1,102 @@
+from functools import lru_cache
+
+import tiktoken
+
+# 대화 맥락 구성
+# 시스템 프롬프트, 검색된 동의서 문단, 최근 대화, 이전 대화 요약을 토큰 예산 안에 맞춥니다.
+
+MESSAGE_OVERHEAD = 4  # 메시지마다 붙는 역할/구분자 토큰 (cl100k 기준 근사치)
+PASSAGES_HEADER = "\n\n아래 동의서 내용을 근거로 답변하고, 동의서에 없는 내용은 담당 의료진과 상담하도록 안내해 주세요."
+SUMMARY_HEADER = "\n\n이전 대화 요약:\n"
+
+
+# tiktoken 인코딩을 불러올 수 없을 때 쓰는 근사 인코딩 (글자 하나를 토큰 하나로 셈)
+# 한국어는 cl100k 기준 글자당 1토큰 안팎이라 예산 계산에 쓰기에 충분히 가깝습니다.
+class ApproximateEncoding:
+    name = "approximate"
+
+    def encode(self, text):
+        return [ord(char) for char in text]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+# tiktoken은 처음 쓸 때 인코딩 파일을 내려받으므로, 네트워크가 없고 TIKTOKEN_CACHE_DIR에도 파일이 없으면 근사 인코딩 사용
+@lru_cache(maxsize=None)
+def get_encoding(model="gpt-3.5-turbo"):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return ApproximateEncoding()
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    return len(get_encoding(model).encode(text))
+
+
+def truncate_tokens(text, max_tokens, model="gpt-3.5-turbo"):
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + "…"
+
+
+def _message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+# 예산에 들어가지 않는 이전 대화는 질문과 답변 첫머리만 남겨 요약합니다 (추가 API 호출 없음)
+def summarize_turns(turns, budget, line_tokens=40):
+    lines = []
+    used = 0
+    for message in reversed(turns):
+        speaker = "환자" if message["role"] == "user" else "상담사"
+        line = f"- {speaker}: {truncate_tokens(message['content'], line_tokens)}"
+        line_cost = count_tokens(line) + 1
+        if used + line_cost > budget:
+            break
+        lines.append(line)
+        used += line_cost
+    return "\n".join(reversed(lines))
+
+
+# OpenAI 메시지 목록과 총 프롬프트 토큰 수 반환
+def build_context(system_prompt, history, prompt, passages=(), budget=3000, summary_budget=300):
+    user_message = {"role": "user", "content": prompt}
+    used = count_tokens(system_prompt) + MESSAGE_OVERHEAD + _message_tokens(user_message)
+
+    # 검색된 문단 (관련도 순으로 예산 안에서만 포함)
+    context_blocks = []
+    header_cost = count_tokens(PASSAGES_HEADER)
+    for passage in passages:
+        block = f"[{passage['source']} {passage['page']}쪽]\n{passage['text']}"
+        cost = count_tokens("\n\n" + block) + (0 if context_blocks else header_cost)
+        if used + cost > budget:
+            break
+        context_blocks.append(block)
+        used += cost
+    if context_blocks:
+        system_prompt += PASSAGES_HEADER + "".join("\n\n" + block for block in context_blocks)
+
+    # 최근 대화 (최신 순으로 채우고, 남는 이전 대화는 요약)
+    turns = [{"role": m["role"], "content": m["content"]} for m in history]
+    recent_budget = budget - used - min(summary_budget, max(budget - used, 0) // 3)
+    recent = []
+    for message in reversed(turns):
+        cost = _message_tokens(message)
+        if cost > recent_budget:
+            break
+        recent.insert(0, message)
+        recent_budget -= cost
+        used += cost
+
+    older = turns[:len(turns) - len(recent)]
+    if older:
+        summary = summarize_turns(older, min(summary_budget, budget - used - count_tokens(SUMMARY_HEADER)))
+        if summary:
+            system_prompt += SUMMARY_HEADER + summary
+
+    messages = [{"role": "system", "content": system_prompt}] + recent + [user_message]
+    return messages, sum(_message_tokens(m) for m in messages)
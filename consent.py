@@ -1,294 +1,252 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 from datetime import datetime
+import json
+import re
+import tempfile
+import time
+import uuid
+
+from chat_context import build_context
+from event_log import EventLog
+from export import EXPORT_FORMATS, write_export
+from faq import FAQBank
+from item_analysis import AnswerMatrix, analyze_items
+from llm_client import LLMClient
+from profiling import Profiler
+from quiz_bank import iter_questions, load_quiz_bank
+from retrieval import GENERAL_SHARD, ShardedRetrievalIndex
+from scheduler import FairScheduler, QueueFull
+from semantic_cache import SemanticCache, normalize_prompt
+from session_memory import PackedAnswers, session_memory_report
+from single_flight import StreamCoalescer
+from store import ParticipantStore
+
+# 페이지 설정
+st.set_page_config(
+    page_title="로봇수술동의서 이해쑥쑥",
+    page_icon="🤖",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# 테마 색상 (관리자 사이드바에서 선택, 헤더 배경에 사용)
+THEME_COLORS = {
+    "초록색 (의료)": ("#4CAF50", "#45a049"),
+    "파란색 (신뢰)": ("#667eea", "#764ba2"),
+    "보라색 (고급)": ("#9c27b0", "#673ab7"),
+    "주황색 (따뜻)": ("#ff9800", "#f57c00"),
+    "빨간색 (강조)": ("#f44336", "#d32f2f"),
+    "청록색 (차분)": ("#00bcd4", "#009688")
+}
+DEFAULT_THEME = "초록색 (의료)"
+
+# 스타일시트 (styles.css를 프로세스당 한 번만 읽고 주석과 공백을 제거)
+@st.cache_resource
+def get_stylesheet():
+    with open("styles.css", encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+# 현재 테마 색상 (관리자 모드에서만 선택한 색상 적용)
+def get_theme_colors():
+    if st.session_state.get('admin_mode', False) and 'selected_color' in st.session_state:
+        return THEME_COLORS.get(st.session_state.selected_color, THEME_COLORS[DEFAULT_THEME])
+    return THEME_COLORS[DEFAULT_THEME]
 
 # 환경 변수 로딩 방식 변경
 # load_dotenv()
 
+# 퀴즈 문항 (파일에서 한 번만 읽고 검사)
+@st.cache_data
+def get_quiz_bank():
+    return load_quiz_bank()
+
+# 빈 퀴즈 답변 (문항 순서대로 고른 보기 번호를 1바이트씩 저장)
+def new_quiz_answers():
+    return PackedAnswers(q_data['id'] for q_data in iter_questions(get_quiz_bank()))
+
+# 세션에 남겨 둘 최근 채팅 메시지 수 (이전 메시지는 저장소로 옮김)
+CHAT_HISTORY_LIMIT = int(os.environ.get("CHAT_HISTORY_LIMIT", "20"))
+
 # 세션 상태 초기화
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
-if 'additional_chat_history' not in st.session_state:
-    st.session_state.additional_chat_history = []
+if 'chat_spilled' not in st.session_state:
+    st.session_state.chat_spilled = 0
 if 'quiz_answers' not in st.session_state:
-    st.session_state.quiz_answers = {}
-if 'quiz_completed' not in st.session_state:
-    st.session_state.quiz_completed = False
+    st.session_state.quiz_answers = new_quiz_answers()
 if 'pre_quiz_completed' not in st.session_state:
     st.session_state.pre_quiz_completed = False
 if 'post_quiz_completed' not in st.session_state:
     st.session_state.post_quiz_completed = False
 if 'post_quiz_answers' not in st.session_state:
-    st.session_state.post_quiz_answers = {}
+    st.session_state.post_quiz_answers = new_quiz_answers()
 if 'current_section' not in st.session_state:
     st.session_state.current_section = 0
-if 'section_scores' not in st.session_state:
-    st.session_state.section_scores = {}
 if 'profile_setup_completed' not in st.session_state:
     st.session_state.profile_setup_completed = False
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "main"
 if 'admin_mode' not in st.session_state:
     st.session_state.admin_mode = False
-if 'all_users_data' not in st.session_state:
-    st.session_state.all_users_data = []
 if 'post_quiz_score' not in st.session_state:
     st.session_state.post_quiz_score = 0
-if 'user_data' not in st.session_state:
-    st.session_state.user_data = []
 
-# OpenAI 클라이언트 설정
-try:
-    api_key = st.secrets["OPENAI_API_KEY"]
-except KeyError:
+# 현재 화면 이름 (프로필 설정과 사전 퀴즈는 current_page와 관계없이 먼저 표시됨)
+def current_page_name():
+    if not st.session_state.get('profile_setup_completed', False):
+        return "profile"
+    if not st.session_state.get('pre_quiz_completed', False):
+        return "pre_quiz"
+    return st.session_state.get('current_page', "main")
+
+# 성능 측정 (CONSENT_PROFILING=1일 때만 동작, 모든 세션이 같은 히스토그램에 기록)
+@st.cache_resource
+def get_profiler():
+    return Profiler(enabled=os.environ.get("CONSENT_PROFILING") == "1", page_fn=current_page_name)
+
+profiler = get_profiler()
+
+# 설정값 (Streamlit secrets에 없으면 환경 변수 사용)
+def get_setting(name, default=None):
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        return os.environ.get(name, default)
+
+# OpenAI 클라이언트 설정 (프로세스당 한 번만 생성하여 연결 풀을 공유)
+# OPENAI_BASE_URL을 지정하면 OpenAI 호환 서버(예: benchmarks/mock_openai.py)로 요청합니다.
+@st.cache_resource
+def get_llm_client():
+    try:
+        api_key = st.secrets["OPENAI_API_KEY"]
+    except (KeyError, FileNotFoundError):
+        return None
+    if not api_key:
+        return None
+    return LLMClient(
+        api_key,
+        base_url=get_setting("OPENAI_BASE_URL") or None,
+        max_connections=int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20")),
+        read_timeout=float(os.environ.get("OPENAI_TIMEOUT", "30")),
+        max_retries=int(os.environ.get("OPENAI_MAX_RETRIES", "4"))
+    )
+
+client = get_llm_client()
+if client is None:
     st.error("API 키가 설정되지 않았습니다. Streamlit secrets를 확인하세요.")
     st.stop()
 
-client = OpenAI(api_key=api_key)
+# 참가자 데이터 저장소 (모든 세션과 프로세스가 공유)
+@st.cache_resource
+def get_participant_store():
+    db_path = os.environ.get("CONSENT_DB_PATH", os.path.join("data", "participants.db"))
+    return ParticipantStore(db_path)
 
-# 페이지 설정
-st.set_page_config(
-    page_title="로봇수술동의서 이해쑥쑥",
-    page_icon="🤖",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+# 상호작용 이벤트 로그 (모든 세션이 같은 버퍼에 기록, 백그라운드에서 파일에 추가)
+@st.cache_resource
+def get_event_log():
+    return EventLog(
+        os.environ.get("CONSENT_EVENT_LOG_DIR", os.path.join("data", "events")),
+        segment_bytes=int(os.environ.get("CONSENT_EVENT_SEGMENT_MB", "16")) * 1024 * 1024
+    )
 
-# 기본 제목 숨기기
-st.markdown("""
-<style>
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    .stApp > header {
-        background-color: transparent;
-    }
-    .stApp {
-        margin-top: 0px;
-        padding-top: 1rem;
-    }
-    .main .block-container {
-        padding-top: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+def log_event(event_type, **fields):
+    get_event_log().emit(event_type, st.session_state.get('participant_id'), **fields)
 
-# CSS 스타일링 - 큰 글씨 적용
-st.markdown("""
-<style>
-    .main-header h1 {
-        font-size: 3rem !important;
-        font-weight: bold !important;
-        color: white !important;
-        margin-bottom: 1rem;
-    }
-    .main-header p {
-        font-size: 1.5rem !important;
-        color: white !important;
-    }
-    .section-header {
-        background: linear-gradient(90deg, #4CAF50 0%, #45a049 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 0.8rem 0;
-        text-align: center;
-    }
-    .section-header h3, .section-header h4 {
-        font-size: 1.8rem !important;
-        font-weight: bold !important;
-        margin: 0;
-    }
-    .info-box {
-        background: linear-gradient(135deg, #2196F3 0%, #1976D2 100%);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 0.8rem 0;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-    }
-    .info-box h4 {
-        font-size: 1.6rem !important;
-        font-weight: bold !important;
-        margin-bottom: 1rem;
-    }
-    .warning-box {
-        background: linear-gradient(135deg, #FF9800 0%, #F57C00 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 0.8rem 0;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-    }
-    .warning-box h4 {
-        font-size: 1.6rem !important;
-        font-weight: bold !important;
-        margin-bottom: 1rem;
-    }
-    .success-box {
-        background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 0.8rem 0;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-    }
-    .success-box h4 {
-        font-size: 1.6rem !important;
-        font-weight: bold !important;
-        margin-bottom: 1rem;
-    }
-    .quiz-box {
-        background: #f5f5f5;
-        border-left: 3px solid #4CAF50;
-        padding: 0.8rem;
-        margin: 0.8rem 0;
-        border-radius: 4px;
-    }
-    .quiz-question {
-        font-weight: bold;
-        color: #2c3e50;
-        margin-bottom: 0.4rem;
-    }
-    .quiz-option {
-        margin: 0.8rem 0;
-        padding: 0.8rem;
-        border-radius: 8px;
-        cursor: pointer;
-        font-size: 1.2rem !important;
-    }
-    .quiz-option:hover {
-        background-color: #e9ecef;
-    }
-    .profile-box {
-        background-color: #f8f9fa;
-        padding: 2rem;
-        border-radius: 15px;
-        border: 3px solid #667eea;
-        margin: 2rem 0;
-        font-size: 1.2rem !important;
-    }
-    .profile-box h3 {
-        font-size: 1.8rem !important;
-        font-weight: bold !important;
-        margin-bottom: 1.5rem;
-        color: #667eea;
-    }
-    
-    /* 일반 텍스트 크기 증가 */
-    .stMarkdown, .stText, .stSelectbox, .stRadio, .stButton {
-        font-size: 1.2rem !important;
-    }
-    
-    /* 탭 텍스트 크기 */
-    .stTabs [data-baseweb="tab-list"] {
-        font-size: 1.4rem !important;
-    }
-    
-    /* 버튼 텍스트 크기 */
-    .stButton > button {
-        background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-        color: white;
-        border: none;
-        border-radius: 20px;
-        padding: 0.4rem 1.5rem;
-        font-weight: bold;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 3px 10px rgba(0,0,0,0.15);
-    }
-    
-    .stButton > button:disabled {
-        background: #ccc;
-        transform: none;
-        box-shadow: none;
-    }
-    
-    /* 라디오 버튼 텍스트 크기 */
-    .stRadio > div > div > div > label {
-        font-size: 1.2rem !important;
-    }
-    
-    /* 셀렉트박스 텍스트 크기 */
-    .stSelectbox > div > div > div > div {
-        font-size: 1.2rem !important;
-    }
-    
-    /* 헤더 텍스트 크기 */
-    h1, h2, h3, h4, h5, h6 {
-        font-size: 1.5rem !important;
-    }
-    
-    /* 일반 텍스트 크기 */
-    p, div, span {
-        font-size: 1.2rem !important;
-    }
-    
-    /* 진행률 바 크기 */
-    .stProgress > div > div > div {
-        height: 20px !important;
-    }
-    
-    .chat-message {
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-radius: 10px;
-        max-width: 80%;
-    }
-    
-    .user-message {
-        background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-        color: white;
-        margin-left: auto;
-    }
-    
-    .assistant-message {
-        background: #f1f3f4;
-        color: #2c3e50;
-        margin-right: auto;
-    }
-    
-    .admin-toggle {
-        position: fixed;
-        bottom: 20px;
-        left: 20px;
-        z-index: 1000;
-    }
-    
-    .admin-dashboard {
-        background: #f8f9fa;
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin: 0.8rem 0;
-        border: 2px solid #4CAF50;
-    }
-    
-    .stats-card {
-        background: white;
-        padding: 1rem;
-        border-radius: 8px;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-        text-align: center;
-        margin: 0.4rem;
-    }
-    
-    .stats-number {
-        font-size: 1.8rem;
-        font-weight: bold;
-        color: #4CAF50;
-    }
-    
-    .stats-label {
-        color: #666;
-        margin-top: 0.4rem;
+# 질문 임베딩
+@profiler.timed("openai.embedding")
+def embed_text(text):
+    response = client.embedding(model="text-embedding-3-small", input=text)
+    return response.data[0].embedding
+
+# 반복 질문 답변 캐시 (프로세스 전체에서 공유): {검색 분할: SemanticCache}
+@st.cache_resource
+def get_answer_caches():
+    return {}
+
+# 답변은 참가자의 수술 유형 분할에서 찾은 문단을 근거로 하므로, 캐시도 분할마다 따로 두어 다른 진료과 참가자에게 재사용하지 않음
+def get_answer_cache(shard):
+    caches = get_answer_caches()
+    cache = caches.get(shard or GENERAL_SHARD)
+    if cache is None:
+        cache = caches.setdefault(shard or GENERAL_SHARD, SemanticCache(
+            embed_text,
+            threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.92")),
+            max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+            ttl=int(os.environ.get("ANSWER_CACHE_TTL", str(24 * 60 * 60)))
+        ))
+    return cache
+
+# 동시에 들어온 같은 질문 합치기 (프로세스 전체에서 공유)
+@st.cache_resource
+def get_chat_coalescer():
+    return StreamCoalescer()
+
+# LLM 호출 대기열 (동시 호출 수 제한, 세션별로 돌아가며 시작)
+@st.cache_resource
+def get_chat_scheduler():
+    return FairScheduler(
+        max_concurrency=int(os.environ.get("OPENAI_MAX_CONCURRENCY", "8")),
+        max_queue=int(os.environ.get("CHAT_QUEUE_LIMIT", "50"))
+    )
+
+# 동의서 검색 인덱스 (ingest.py로 미리 생성, 진료과별 분할은 처음 검색할 때 메모리 매핑)
+@st.cache_resource
+def get_retrieval_index():
+    return ShardedRetrievalIndex.load(
+        os.environ.get("CONSENT_INDEX_DIR", "index"),
+        max_resident=int(os.environ.get("RAG_MAX_RESIDENT_SHARDS", "3"))
+    )
+
+# 자주 묻는 질문 답변 (build_faq.py로 미리 생성, 시작 시 한 번만 읽음)
+@st.cache_resource
+def get_faq_bank():
+    return FAQBank.load(
+        os.environ.get("CONSENT_INDEX_DIR", "index"),
+        lexical_threshold=float(os.environ.get("FAQ_LEXICAL_THRESHOLD", "0.7")),
+        semantic_threshold=float(os.environ.get("FAQ_SEMANTIC_THRESHOLD", "0.9"))
+    )
+
+# 최적화된 이미지 (build_assets.py로 생성, 프로세스당 한 번만 읽어 메모리에 보관)
+# 표시 너비와 같은 PNG를 output_format="PNG"로 넘기면 st.image가 다시 변환하지 않고 그대로 전송합니다
+# (기본값 "auto"는 투명도가 없는 이미지를 JPEG로 다시 인코딩).
+@st.cache_resource
+def load_image_asset(name, width):
+    path = os.path.join("images", "dist", f"{name}_{width}.png")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+# 현재 사용자 데이터 저장 (참가자 ID 기준으로 덮어쓰기)
+def save_current_user():
+    if 'participant_id' not in st.session_state:
+        return
+    record = {
+        "timestamp": st.session_state.participant_created_at,
+        "profile": st.session_state.get('user_profile', {}),
+        "pre_quiz_answers": st.session_state.quiz_answers.to_dict(QUIZZES['pre']['answer_prefix']),
+        "post_quiz_answers": st.session_state.post_quiz_answers.to_dict(QUIZZES['post']['answer_prefix']),
+        "pre_quiz_completed": st.session_state.get('pre_quiz_completed', False),
+        "post_quiz_completed": st.session_state.get('post_quiz_completed', False),
+        "post_quiz_score": st.session_state.get('post_quiz_score', 0)
     }
-</style>
-""", unsafe_allow_html=True)
+    get_participant_store().save(st.session_state.participant_id, record)
+
+# 스타일시트 적용 (한 번만 읽고 압축한 뒤 매번 같은 내용을 전송, 테마 색상은 CSS 변수로만 변경)
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
+theme_colors = get_theme_colors()
+if theme_colors != THEME_COLORS[DEFAULT_THEME]:
+    st.markdown(
+        f"<style>:root{{--theme-primary:{theme_colors[0]};--theme-secondary:{theme_colors[1]};}}</style>",
+        unsafe_allow_html=True
+    )
 
 # 메인 헤더
 st.markdown("""
@@ -299,66 +257,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 상단 네비게이션
+@profiler.timed()
 def render_top_navigation():
-    # 상단 네비게이션 스타일 및 메인 헤더
-    st.markdown("""
-    <style>
-        .main-header {
-            padding: 2rem;
-            border-radius: 15px;
-            margin-top: -3rem; /* 기존에 설정된 값 유지 */
-            margin-bottom: 2rem;
-            text-align: center;
-        }
-        .top-nav {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            flex-wrap: wrap;
-            gap: 1rem;
-            margin-bottom: 2rem;
-        }
-        .nav-button {
-            background: rgba(255, 255, 255, 0.2);
-            color: white;
-            padding: 0.5rem 1rem;
-            border: 2px solid rgba(255, 255, 255, 0.3);
-            border-radius: 20px;
-            text-decoration: none;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            cursor: pointer;
-        }
-        .nav-button:hover {
-            background: rgba(255, 255, 255, 0.3);
-            transform: translateY(-2px);
-        }
-        .nav-button.active {
-            background: rgba(255, 255, 255, 0.4);
-            border-color: white;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # 메인 헤더와 이미지
     with st.container():
-        selected_colors = ("#4CAF50", "#45a049") # 기본 초록색 테마
-        if st.session_state.get('admin_mode', False) and 'selected_color' in st.session_state:
-            color_options = {
-                "초록색 (의료)": ("#4CAF50", "#45a049"),
-                "파란색 (신뢰)": ("#667eea", "#764ba2"),
-                "보라색 (고급)": ("#9c27b0", "#673ab7"),
-                "주황색 (따뜻)": ("#ff9800", "#f57c00"),
-                "빨간색 (강조)": ("#f44336", "#d32f2f"),
-                "청록색 (차분)": ("#00bcd4", "#009688")
-            }
-            selected_colors = color_options.get(st.session_state.selected_color, selected_colors)
-
-        st.markdown(f"""
-        <div class="main-header" style="background: linear-gradient(90deg, {selected_colors[0]} 0%, {selected_colors[1]} 100%);">
-            <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; padding: 1rem;">
-                <h1 style="font-size: 3rem !important; font-weight: bold !important; color: white !important; margin: 0;">로봇수술동의서 이해쑥쑥</h1>
-                <p style="font-size: 1.5rem !important; color: white !important; margin: 0;">로봇수술에 대한 이해를 도와드리겠습니다.</p>
+        st.markdown("""
+        <div class="main-header themed">
+            <div class="header-content">
+                <h1>로봇수술동의서 이해쑥쑥</h1>
+                <p>로봇수술에 대한 이해를 도와드리겠습니다.</p>
             </div>
         </div>
         """, unsafe_allow_html=True)
@@ -416,7 +323,16 @@ def render_top_navigation():
         </div>
         """, unsafe_allow_html=True)
 
+# 프로필 항목 (표시 이름, 선택지) - 관리자 목록 필터에서도 사용
+PROFILE_FIELDS = {
+    "age": ("나이", ["20-30대", "30-40대", "40-50대", "50-60대", "60-70대", "70대 이상"]),
+    "gender": ("성별", ["남성", "여성"]),
+    "education": ("교육 수준", ["고등학교 졸업", "대학교 졸업", "대학원 졸업", "기타"]),
+    "medical_experience": ("수술 유형", ["비뇨기과", "산부인과", "흉부외과", "외과", "기타"])
+}
+
 # 사용자 프로필 설정
+@profiler.timed()
 def render_profile_setup():
     st.markdown("""
     <div class="profile-box">
@@ -428,32 +344,36 @@ def render_profile_setup():
     
     with col1:
         age = st.selectbox(
-            "나이",
-            ["20-30대", "30-40대", "40-50대", "50-60대", "60-70대", "70대 이상"],
+            PROFILE_FIELDS["age"][0],
+            PROFILE_FIELDS["age"][1],
             key="age"
         )
         
         gender = st.selectbox(
-            "성별",
-            ["남성", "여성"],
+            PROFILE_FIELDS["gender"][0],
+            PROFILE_FIELDS["gender"][1],
             key="gender"
         )
     
     with col2:
         education = st.selectbox(
-            "교육 수준",
-            ["고등학교 졸업", "대학교 졸업", "대학원 졸업", "기타"],
+            PROFILE_FIELDS["education"][0],
+            PROFILE_FIELDS["education"][1],
             key="education"
         )
         
         medical_experience = st.selectbox(
-            "수술 유형",
-            ["비뇨기과", "산부인과", "흉부외과", "외과", "기타"],
+            PROFILE_FIELDS["medical_experience"][0],
+            PROFILE_FIELDS["medical_experience"][1],
             key="medical_experience"
         )
     
     # 확인 버튼만 표시
     if st.button("확인", key="profile_submit", use_container_width=True):
+        # 참가자 ID는 처음 한 번만 발급 (프로필을 다시 설정해도 유지)
+        if 'participant_id' not in st.session_state:
+            st.session_state.participant_id = uuid.uuid4().hex
+            st.session_state.participant_created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         st.session_state.profile_setup_completed = True
         st.session_state.user_profile = {
             "age": age,
@@ -461,596 +381,430 @@ def render_profile_setup():
             "education": education,
             "medical_experience": medical_experience
         }
+        save_current_user()
+        log_event(
+            "profile_submitted",
+            created_at=st.session_state.participant_created_at,
+            profile=st.session_state.user_profile
+        )
         st.success("감사합니다. 먼저 몇가지 퀴즈를 풀어보세요!")
         st.rerun()
 
-# 사전 퀴즈
-def render_pre_quiz():
-    st.markdown("""
+# 사전/사후 퀴즈 설정 (문항은 같고 표시 방식만 다름)
+QUIZZES = {
+    "pre": {
+        "title": "📝 사전 이해도 평가",
+        "guide": "로봇수술에 대한 현재 이해도를 평가하기 위한 퀴즈입니다.",
+        "answer_prefix": "q",
+        "answers_state": "quiz_answers",
+        "button_prefix": "",
+        "submit_key": "pre_quiz_submit",
+        "submit_label": "퀴즈 제출",
+        "show_feedback": False
+    },
+    "post": {
+        "title": "📝 사후 이해도 평가",
+        "guide": "로봇수술 정보를 학습한 후 이해도를 평가하기 위한 퀴즈입니다.",
+        "answer_prefix": "pq",
+        "answers_state": "post_quiz_answers",
+        "button_prefix": "post_",
+        "submit_key": "post_quiz_submit",
+        "submit_label": "사후 퀴즈 제출",
+        "show_feedback": True
+    }
+}
+
+# 문항 분석용 답변 행렬 (프로세스 전체에서 공유, 수정된 참가자의 행만 다시 읽음)
+@st.cache_resource
+def get_answer_matrix(question_count):
+    return AnswerMatrix(question_count)
+
+# 문항 분석 (데이터 버전이 바뀔 때만 다시 계산)
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_item_analysis(data_version):
+    questions = list(iter_questions(get_quiz_bank()))
+    answer_matrix = get_answer_matrix(len(questions))
+    answer_matrix.refresh(get_participant_store().iter_answer_rows(
+        [f"{QUIZZES['pre']['answer_prefix']}{q_data['id']}" for q_data in questions],
+        [f"{QUIZZES['post']['answer_prefix']}{q_data['id']}" for q_data in questions],
+        since=answer_matrix.version
+    ))
+    return analyze_items(*answer_matrix.matrices(), questions)
+
+# 퀴즈 화면 (섹션 단위로 문항 표시)
+def render_quiz(quiz_type):
+    quiz = QUIZZES[quiz_type]
+    sections = get_quiz_bank()["sections"]
+    
+    st.markdown(f"""
     <div class="section-header">
-        <h3>📝 사전 이해도 평가</h3>
+        <h3>{quiz['title']}</h3>
     </div>
     """, unsafe_allow_html=True)
     
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-box">
         <h4>안내</h4>
-        <p>로봇수술에 대한 현재 이해도를 평가하기 위한 퀴즈입니다.</p>
+        <p>{quiz['guide']}</p>
     </div>
     """, unsafe_allow_html=True)
     
     # 현재 세션 상태 확인
-    current_section = st.session_state.get('current_section', 0)
+    current_section = min(st.session_state.get('current_section', 0), len(sections) - 1)
+    section = sections[current_section]
     
-    # Ⅰ. 수술 목적 및 과정 (4문항)
-    if current_section == 0:
-        st.markdown("""
-        <div class="section-header">
-            <h4>Ⅰ. 수술 목적 및 과정 (4문항)</h4>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        questions_section1 = {
-            "q1": {
-                "question": "1. 로봇보조수술의 장점이 아닌 것은?",
-                "options": [
-                    "절개 부위가 작아 회복이 빠를 수 있다",
-                    "로봇 팔을 통해 정밀한 조작이 가능하다",
-                    "수술 중 로봇이 자율적으로 판단하여 수술을 진행한다",
-                    "출혈 및 감염 위험이 줄어들 수 있다"
-                ],
-                "correct": 2
-            },
-            "q2": {
-                "question": "2. 수술 부위에 2cm 정도의 절개를 몇 군데 낼까요?",
-                "options": [
-                    "1~2곳",
-                    "2~3곳",
-                    "3~5곳",
-                    "5~7곳"
-                ],
-                "correct": 2
-            },
-            "q3": {
-                "question": "3. 로봇보조수술 시 의사는 어떤 방식으로 수술을 수행하나요?",
-                "options": [
-                    "로봇이 자동으로 수행하며 의사는 모니터링만 한다",
-                    "외과의가 직접 기구를 손으로 조작한다",
-                    "외과의가 콘솔을 통해 로봇 팔을 원격으로 조작한다",
-                    "인공지능이 수술 계획을 분석한 후 자율로 시행한다"
-                ],
-                "correct": 2
-            },
-            "q4": {
-                "question": "4. 로봇수술 도중 개복수술로 바뀔 수 있는 상황이 아닌 것은?",
-                "options": [
-                    "장(창자)이 서로 붙어 있는 '유착'이 심할 때",
-                    "피가 많이 날 때",
-                    "혹이 암일지도 몰라서 더 자세히 확인해야 할 때",
-                    "로봇 팔이 깊은 곳까지 들어갈 때"
-                ],
-                "correct": 3
-            }
-        }
-        
-        for q_id, q_data in questions_section1.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
-            
-            if answer is not None:
-                st.session_state.quiz_answers[q_id] = q_data['options'].index(answer)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("이전", key="prev_section1"):
+    st.markdown(f"""
+    <div class="section-header">
+        <h4>{section['title']} ({len(section['questions'])}문항)</h4>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    render_quiz_section(quiz_type, current_section)
+    
+    section_number = current_section + 1
+    col1, col2 = st.columns(2)
+    with col1:
+        if current_section > 0:
+            if st.button("이전", key=f"prev_{quiz['button_prefix']}section{section_number}"):
+                change_section(quiz_type, current_section, current_section - 1)
+                st.rerun()
+        elif quiz_type == "pre":
+            if st.button("이전", key=f"prev_section{section_number}"):
                 # 프로필 설정으로 돌아가기
                 st.session_state.profile_setup_completed = False
                 if 'user_profile' in st.session_state:
                     del st.session_state.user_profile
                 st.rerun()
-        with col2:
-            if st.button("다음", key="next_section1"):
-                st.session_state.current_section = 1
-                st.rerun()
-    
-    # Ⅱ. 수술 위험 및 합병증과 관리 (4문항)
-    elif current_section == 1:
-        st.markdown("""
-        <div class="section-header">
-            <h4>Ⅱ. 수술 위험 및 합병증과 관리 (4문항)</h4>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        questions_section2 = {
-            "q5": {
-                "question": "5. 로봇 수술에서 임파선 적출 후 생길 수 있는 부작용은 무엇인가요?",
-                "options": [
-                    "혈압 상승",
-                    "임파액 정체로 인한 부종",
-                    "심장 두근거림",
-                    "시야 흐림"
-                ],
-                "correct": 1
-            },
-            "q6": {
-                "question": "6. 수술 후 폐에 문제가 생기는 것을 예방하기 위해 어떤 행동이 도움이 될까요?",
-                "options": [
-                    "움직이지 말고 계속 누워 있기",
-                    "말을 적게 하고 조용히 있기",
-                    "깊게 숨 쉬기 운동을 하고, 조금씩 자주 움직이기",
-                    "얕고 빠르게 숨쉬기 운동하기"
-                ],
-                "correct": 2
-            },
-            "q7": {
-                "question": "7. 무통주사(아픈 걸 줄여주는 주사)를 맞을 때 생길 수 있는 일은?",
-                "options": [
-                    "속이 울렁거리고 어지러울 수 있어요",
-                    "갑자기 땀이 나요",
-                    "배가 아프고 손이 떨려요",
-                    "기침이 멈추지 않아요"
-                ],
-                "correct": 0
-            },
-            "q8": {
-                "question": "8. 장(창자)이 서로 붙는 걸 '유착'이라고 해요. 유착을 막으려면 어떻게 해야 할까요?",
-                "options": [
-                    "가만히 누워 있기",
-                    "수술 다음 날부터 걷기 운동하기",
-                    "음식을 전혀 먹지 않기",
-                    "배를 누르면서 운동하기"
-                ],
-                "correct": 1
-            }
-        }
-        
-        for q_id, q_data in questions_section2.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
-            
-            if answer is not None:
-                st.session_state.quiz_answers[q_id] = q_data['options'].index(answer)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("이전", key="prev_section2"):
-                st.session_state.current_section = 0
-                st.rerun()
-        with col2:
-            if st.button("다음", key="next_section2"):
-                st.session_state.current_section = 2
-                st.rerun()
-    
-    # Ⅲ. 자기결정권 (2문항)
-    elif current_section == 2:
-        st.markdown("""
-        <div class="section-header">
-            <h4>Ⅲ. 자기결정권 (2문항)</h4>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        questions_section3 = {
-            "q9": {
-                "question": "9. 수술에 대한 선택은 누가 최종적으로 결정하나요?",
-                "options": [
-                    "의사",
-                    "가족",
-                    "환자"
-                ],
-                "correct": 2
-            },
-            "q10": {
-                "question": "10. 자기결정권에 해당하지 않는 내용은 무엇인가요?",
-                "options": [
-                    "설명을 듣고 동의한다",
-                    "잘 모르니 의료진에게 맡긴다.",
-                    "부작용 가능성을 인지한다.",
-                    "언제든 수술동의를 철회할 수 있다."
-                ],
-                "correct": 0
-            }
-        }
-        
-        for q_id, q_data in questions_section3.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
-            
-            if answer is not None:
-                st.session_state.quiz_answers[q_id] = q_data['options'].index(answer)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("이전", key="prev_section3"):
-                st.session_state.current_section = 1
-                st.rerun()
-        with col2:
-            if st.button("퀴즈 제출", key="pre_quiz_submit"):
-                st.session_state.pre_quiz_completed = True
-                st.session_state.current_section = 0  # 다음 사용자를 위해 초기화
-                st.success("퀴즈가 제출되었습니다!")
+        else:
+            st.button("이전", key=f"prev_{quiz['button_prefix']}section{section_number}", disabled=True)
+    with col2:
+        if current_section < len(sections) - 1:
+            if st.button("다음", key=f"next_{quiz['button_prefix']}section{section_number}"):
+                change_section(quiz_type, current_section, current_section + 1)
                 st.rerun()
+        elif st.button(quiz['submit_label'], key=quiz['submit_key']):
+            if quiz_type == "pre":
+                submit_pre_quiz()
+            else:
+                submit_post_quiz(sections)
+            st.rerun()
 
-# 사후 퀴즈
-def render_post_quiz():
-    st.markdown("""
-    <div class="section-header">
-        <h3>📝 사후 이해도 평가</h3>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("""
-    <div class="info-box">
-        <h4>안내</h4>
-        <p>로봇수술 정보를 학습한 후 이해도를 평가하기 위한 퀴즈입니다.</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # 현재 세션 상태 확인
-    current_section = st.session_state.get('current_section', 0)
-    
-    # Ⅰ. 수술 목적 및 과정 (4문항)
-    if current_section == 0:
-        st.markdown("""
-        <div class="section-header">
-            <h4>Ⅰ. 수술 목적 및 과정 (4문항)</h4>
+# 퀴즈 섹션 이동
+def change_section(quiz_type, from_section, to_section):
+    st.session_state.current_section = to_section
+    log_event("section_changed", quiz=quiz_type, from_section=from_section, to_section=to_section)
+
+# 퀴즈 섹션 문항 (답변을 고르면 이 부분만 다시 실행)
+@st.fragment
+@profiler.timed()
+def render_quiz_section(quiz_type, section_index):
+    quiz = QUIZZES[quiz_type]
+    section = get_quiz_bank()["sections"][section_index]
+    answers = st.session_state[quiz["answers_state"]]
+    
+    for q_data in section['questions']:
+        q_id = f"{quiz['answer_prefix']}{q_data['id']}"
+        st.markdown(f"""
+        <div class="quiz-box">
+            <div class="quiz-question">{q_data['question']}</div>
         </div>
         """, unsafe_allow_html=True)
         
-        post_questions_section1 = {
-            "pq1": {
-                "question": "1. 로봇보조수술의 장점이 아닌 것은?",
-                "options": [
-                    "절개 부위가 작아 회복이 빠를 수 있다",
-                    "로봇 팔을 통해 정밀한 조작이 가능하다",
-                    "수술 중 로봇이 자율적으로 판단하여 수술을 진행한다",
-                    "출혈 및 감염 위험이 줄어들 수 있다"
-                ],
-                "correct": 2,
-                "explanation": "로봇수술은 의사가 콘솔을 통해 로봇 팔을 조작하는 방식입니다. 로봇이 자율적으로 판단하여 수술을 진행하는 것은 아닙니다."
-            },
-            "pq2": {
-                "question": "2. 수술 부위에 2cm 정도의 절개를 몇 군데 낼까요?",
-                "options": [
-                    "1~2곳",
-                    "2~3곳",
-                    "3~5곳",
-                    "5~7곳"
-                ],
-                "correct": 2,
-                "explanation": "로봇수술에서는 보통 3~5곳에 작은 절개를 만들어 로봇 팔과 카메라를 삽입합니다."
-            },
-            "pq3": {
-                "question": "3. 로봇보조수술 시 의사는 어떤 방식으로 수술을 수행하나요?",
-                "options": [
-                    "로봇이 자동으로 수행하며 의사는 모니터링만 한다",
-                    "외과의가 직접 기구를 손으로 조작한다",
-                    "외과의가 콘솔을 통해 로봇 팔을 원격으로 조작한다",
-                    "인공지능이 수술 계획을 분석한 후 자율로 시행한다"
-                ],
-                "correct": 2,
-                "explanation": "의사는 콘솔에 앉아서 3D 영상을 보면서 로봇 팔을 원격으로 조작하여 수술을 수행합니다."
-            },
-            "pq4": {
-                "question": "4. 로봇수술 도중 개복수술로 바뀔 수 있는 상황이 아닌 것은?",
-                "options": [
-                    "장(창자)이 서로 붙어 있는 '유착'이 심할 때",
-                    "피가 많이 날 때",
-                    "혹이 암일지도 몰라서 더 자세히 확인해야 할 때",
-                    "로봇 팔이 깊은 곳까지 들어갈 때"
-                ],
-                "correct": 3,
-                "explanation": "로봇 팔이 깊은 곳까지 들어가는 것은 정상적인 수술 과정입니다. 유착, 출혈, 암 의심 등의 상황에서 개복수술로 전환될 수 있습니다."
-            }
-        }
+        # 현재 답변 상태 확인
+        current_answer = answers.get(q_data['id'])
         
-        for q_id, q_data in post_questions_section1.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.post_quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
+        answer = st.radio(
+            "답변을 선택하세요:",
+            q_data['options'],
+            key=q_id,
+            label_visibility="collapsed",
+            index=None if current_answer is None else current_answer
+        )
+        
+        if answer is not None:
+            option_index = q_data['options'].index(answer)
+            if option_index != current_answer:
+                answers.set(q_data['id'], option_index)
+                log_event("answer_selected", quiz=quiz_type, answer_key=q_id, option=option_index)
             
-            if answer is not None:
-                st.session_state.post_quiz_answers[q_id] = q_data['options'].index(answer)
-                
-                # 정답을 클릭했을 때만 해설 표시
-                if st.session_state.post_quiz_answers[q_id] == q_data['correct']:
-                    st.markdown("""
+            # 사후 퀴즈는 답변마다 정답 여부와 해설 표시
+            if quiz['show_feedback']:
+                if answers.get(q_data['id']) == q_data['correct']:
+                    st.markdown(f"""
                     <div class="success-box">
                         <h4>✅ 정답입니다!</h4>
-                        <p>""" + q_data['explanation'] + """</p>
+                        <p>{q_data['explanation']}</p>
                     </div>
                     """, unsafe_allow_html=True)
                 else:
-                    st.markdown("""
+                    st.markdown(f"""
                     <div class="warning-box">
                         <h4>❌ 틀렸습니다.</h4>
-                        <p>""" + q_data['explanation'] + """</p>
+                        <p>{q_data['explanation']}</p>
                     </div>
                     """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("이전", key="prev_post_section1", disabled=True):
-                pass
-        with col2:
-            if st.button("다음", key="next_post_section1"):
-                st.session_state.current_section = 1
-                st.rerun()
-    
-    # Ⅱ. 수술 위험 및 합병증과 관리 (4문항)
-    elif current_section == 1:
+
+# 사전 퀴즈 제출
+def submit_pre_quiz():
+    st.session_state.pre_quiz_completed = True
+    st.session_state.current_section = 0  # 다음 사용자를 위해 초기화
+    save_current_user()
+    log_event("quiz_completed", quiz="pre")
+    st.success("퀴즈가 제출되었습니다!")
+
+# 사후 퀴즈 제출 (점수 계산 및 피드백)
+def submit_post_quiz(sections):
+    questions = [q for section in sections for q in section['questions']]
+    total_questions = len(questions)
+    correct_answers = sum(
+        1 for q_data in questions
+        if st.session_state.post_quiz_answers.get(q_data['id']) == q_data['correct']
+    )
+    
+    score_percentage = (correct_answers / total_questions) * 100
+    
+    st.session_state.post_quiz_completed = True
+    st.session_state.post_quiz_score = score_percentage
+    st.session_state.current_section = 0  # 다음 사용자를 위해 초기화
+    save_current_user()
+    log_event("quiz_completed", quiz="post", score=score_percentage)
+    
+    st.success(f"사후 퀴즈가 제출되었습니다! 점수: {correct_answers}/{total_questions} ({score_percentage:.1f}%)")
+    
+    # 점수에 따른 피드백
+    if score_percentage >= 80:
         st.markdown("""
-        <div class="section-header">
-            <h4>Ⅱ. 수술 위험 및 합병증과 관리 (4문항)</h4>
+        <div class="success-box">
+            <h4>🎉 훌륭합니다!</h4>
+            <p>로봇수술에 대한 이해도가 매우 높습니다. 이제 자신감을 가지고 수술에 임하실 수 있습니다.</p>
         </div>
         """, unsafe_allow_html=True)
-        
-        post_questions_section2 = {
-            "pq5": {
-                "question": "5. 로봇 수술에서 임파선 적출 후 생길 수 있는 부작용은 무엇인가요?",
-                "options": [
-                    "혈압 상승",
-                    "임파액 정체로 인한 부종",
-                    "심장 두근거림",
-                    "시야 흐림"
-                ],
-                "correct": 1,
-                "explanation": "임파선을 제거하면 임파액의 흐름이 막혀서 부종이 생길 수 있습니다. 이는 정상적인 수술 후 현상입니다."
-            },
-            "pq6": {
-                "question": "6. 수술 후 폐에 문제가 생기는 것을 예방하기 위해 어떤 행동이 도움이 될까요?",
-                "options": [
-                    "움직이지 말고 계속 누워 있기",
-                    "말을 적게 하고 조용히 있기",
-                    "깊게 숨 쉬기 운동을 하고, 조금씩 자주 움직이기",
-                    "얕고 빠르게 숨쉬기 운동하기"
-                ],
-                "correct": 2,
-                "explanation": "깊은 호흡 운동과 조기 보행은 폐 합병증을 예방하는 가장 좋은 방법입니다."
-            },
-            "pq7": {
-                "question": "7. 무통주사(아픈 걸 줄여주는 주사)를 맞을 때 생길 수 있는 일은?",
-                "options": [
-                    "속이 울렁거리고 어지러울 수 있어요",
-                    "갑자기 땀이 나요",
-                    "배가 아프고 손이 떨려요",
-                    "기침이 멈추지 않아요"
-                ],
-                "correct": 0,
-                "explanation": "무통주사 후에는 속이 울렁거리거나 어지러울 수 있습니다. 이는 정상적인 반응입니다."
-            },
-            "pq8": {
-                "question": "8. 장(창자)이 서로 붙는 걸 '유착'이라고 해요. 유착을 막으려면 어떻게 해야 할까요?",
-                "options": [
-                    "가만히 누워 있기",
-                    "수술 다음 날부터 걷기 운동하기",
-                    "음식을 전혀 먹지 않기",
-                    "배를 누르면서 운동하기"
-                ],
-                "correct": 1,
-                "explanation": "조기 보행은 장의 움직임을 촉진하여 유착을 예방하는 데 도움이 됩니다."
-            }
-        }
-        
-        for q_id, q_data in post_questions_section2.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.post_quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
-            
-            if answer is not None:
-                st.session_state.post_quiz_answers[q_id] = q_data['options'].index(answer)
-                
-                # 정답을 클릭했을 때만 해설 표시
-                if st.session_state.post_quiz_answers[q_id] == q_data['correct']:
-                    st.markdown("""
-                    <div class="success-box">
-                        <h4>✅ 정답입니다!</h4>
-                        <p>""" + q_data['explanation'] + """</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown("""
-                    <div class="warning-box">
-                        <h4>❌ 틀렸습니다.</h4>
-                        <p>""" + q_data['explanation'] + """</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("이전", key="prev_post_section2"):
-                st.session_state.current_section = 0
-                st.rerun()
-        with col2:
-            if st.button("다음", key="next_post_section2"):
-                st.session_state.current_section = 2
-                st.rerun()
-    
-    # Ⅲ. 자기결정권 (2문항)
-    elif current_section == 2:
+    elif score_percentage >= 60:
         st.markdown("""
-        <div class="section-header">
-            <h4>Ⅲ. 자기결정권 (2문항)</h4>
+        <div class="info-box">
+            <h4>👍 잘하셨습니다!</h4>
+            <p>로봇수술에 대한 기본적인 이해를 잘 하셨습니다. 추가 질문이 있으시면 언제든 물어보세요.</p>
         </div>
         """, unsafe_allow_html=True)
-        
-        post_questions_section3 = {
-            "pq9": {
-                "question": "9. 수술에 대한 선택은 누가 최종적으로 결정하나요?",
-                "options": [
-                    "의사",
-                    "가족",
-                    "환자"
-                ],
-                "correct": 2,
-                "explanation": "수술에 대한 최종 결정은 환자가 내려야 합니다. 의사는 정보를 제공하고 권고할 수 있지만, 최종 선택은 환자의 권리입니다."
-            },
-            "pq10": {
-                "question": "10. 자기결정권에 해당하지 않는 내용은 무엇인가요?",
-                "options": [
-                    "설명을 듣고 동의한다",
-                    "잘 모르니 의료진에게 맡긴다.",
-                    "부작용 가능성을 인지한다.",
-                    "언제든 수술동의를 철회할 수 있다."
-                ],
-                "correct": 0,
-                "explanation": "자기결정권은 충분한 정보를 바탕으로 스스로 결정하는 것입니다. '잘 모르니 의료진에게 맡긴다'는 것은 자기결정권이 아닙니다."
+    else:
+        st.markdown("""
+        <div class="warning-box">
+            <h4>📚 더 공부해보세요</h4>
+            <p>로봇수술에 대한 이해를 더 높이기 위해 정보를 다시 읽어보시거나 질문해보세요.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+# 사전 퀴즈
+@profiler.timed()
+def render_pre_quiz():
+    render_quiz("pre")
+
+# 사후 퀴즈
+@profiler.timed()
+def render_post_quiz():
+    render_quiz("post")
+
+# 사용자 목록 (필터 조건에 맞는 참가자를 한 페이지씩 조회, 현재 페이지 기록 반환)
+def render_participant_list(store):
+    filter_cols = st.columns(3) + st.columns(3)
+    filters = {}
+    
+    with filter_cols[0]:
+        date_range = st.date_input("참여 기간", value=(), key="admin_filter_dates")
+    if date_range:
+        filters["since"] = f"{date_range[0]:%Y-%m-%d} 00:00:00"
+        filters["until"] = f"{date_range[-1]:%Y-%m-%d} 23:59:59"
+    
+    for col, (field, (label, options)) in zip(filter_cols[1:5], PROFILE_FIELDS.items()):
+        with col:
+            filters[field] = st.multiselect(label, options, key=f"admin_filter_{field}")
+    
+    with filter_cols[5]:
+        page_size = st.selectbox("페이지당 인원", [20, 50, 100], key="admin_page_size")
+    
+    # 조건이 바뀌면 첫 페이지부터 다시 조회 (페이지마다 이전 페이지 마지막 기록을 기준으로 이어서 읽음)
+    filter_key = (repr(sorted(filters.items())), page_size)
+    if st.session_state.get("admin_list_filter_key") != filter_key:
+        st.session_state.admin_list_filter_key = filter_key
+        st.session_state.admin_list_cursors = [None]
+    cursors = st.session_state.admin_list_cursors
+    
+    records, has_next = store.list_page(filters, page_size=page_size, before=cursors[-1])
+    
+    if records:
+        st.dataframe(
+            [
+                {
+                    "ID": user['id'],
+                    "참여 시각": user['timestamp'],
+                    "나이": user['profile']['age'],
+                    "성별": user['profile']['gender'],
+                    "교육수준": user['profile']['education'],
+                    "수술 유형": user['profile']['medical_experience'],
+                    "사전 퀴즈": "✅" if user['pre_quiz_completed'] else "❌",
+                    "사후 퀴즈": "✅" if user['post_quiz_completed'] else "❌",
+                    "사후 점수": f"{user['post_quiz_score']:.1f}%" if user['post_quiz_completed'] else ""
+                }
+                for user in records
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.write("조건에 맞는 사용자가 없습니다.")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("이전", key="admin_list_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"{len(cursors)}페이지")
+    with col3:
+        if st.button("다음", key="admin_list_next", disabled=not has_next):
+            cursors.append((records[-1]['timestamp'], records[-1]['id']))
+            st.rerun()
+    
+    return records
+
+# 성능 측정 결과 (화면별 구간 시간의 백분위수, 느린 구간부터 표시)
+def render_profiling_stats():
+    rows = profiler.snapshot()
+    if not rows:
+        st.write("아직 측정된 데이터가 없습니다.")
+        return
+    
+    pages = sorted({row['page'] for row in rows})
+    page = st.selectbox("화면", pages, key="admin_profile_page")
+    page_rows = sorted((row for row in rows if row['page'] == page), key=lambda row: row['p95'], reverse=True)
+    st.dataframe(
+        [
+            {
+                "구간": row['name'],
+                "횟수": row['count'],
+                "평균 (ms)": round(row['mean'] * 1000, 1),
+                "p50 (ms)": round(row['p50'] * 1000, 1),
+                "p95 (ms)": round(row['p95'] * 1000, 1),
+                "p99 (ms)": round(row['p99'] * 1000, 1),
+                "최대 (ms)": round(row['max'] * 1000, 1)
             }
-        }
-        
-        for q_id, q_data in post_questions_section3.items():
-            st.markdown(f"""
-            <div class="quiz-box">
-                <div class="quiz-question">{q_data['question']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 현재 답변 상태 확인
-            current_answer = st.session_state.post_quiz_answers.get(q_id, None)
-            
-            answer = st.radio(
-                "답변을 선택하세요:",
-                q_data['options'],
-                key=q_id,
-                label_visibility="collapsed",
-                index=None if current_answer is None else current_answer
-            )
-            
-            if answer is not None:
-                st.session_state.post_quiz_answers[q_id] = q_data['options'].index(answer)
-                
-                # 정답을 클릭했을 때만 해설 표시
-                if st.session_state.post_quiz_answers[q_id] == q_data['correct']:
-                    st.markdown("""
-                    <div class="success-box">
-                        <h4>✅ 정답입니다!</h4>
-                        <p>""" + q_data['explanation'] + """</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown("""
-                    <div class="warning-box">
-                        <h4>❌ 틀렸습니다.</h4>
-                        <p>""" + q_data['explanation'] + """</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
+            for row in page_rows
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption("백분위수는 10% 간격 구간으로 집계한 근삿값입니다. 화면 함수의 시간에는 그 안에서 호출한 함수의 시간이 포함됩니다.")
+    
+    if st.button("측정값 초기화", key="admin_profile_reset"):
+        profiler.reset()
+        st.rerun()
+
+# 자주 묻는 질문과 답변 캐시 적중률 (OpenAI를 호출하지 않고 답한 비율)
+def render_answer_reuse_stats():
+    faq_bank = get_faq_bank()
+    if faq_bank is None:
+        st.write("자주 묻는 질문 인덱스가 없습니다. build_faq.py를 실행하여 생성하세요.")
+    else:
+        faq_stats = faq_bank.stats()
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            if st.button("이전", key="prev_post_section3"):
-                st.session_state.current_section = 1
-                st.rerun()
+            st.metric("FAQ 적중률", f"{faq_stats['hit_ratio'] * 100:.1f}%")
         with col2:
-            if st.button("사후 퀴즈 제출", key="post_quiz_submit"):
-                # 점수 계산
-                total_questions = 10
-                correct_answers = 0
-                
-                for q_id, q_data in {**post_questions_section1, **post_questions_section2, **post_questions_section3}.items():
-                    if st.session_state.post_quiz_answers.get(q_id) == q_data['correct']:
-                        correct_answers += 1
-                
-                score_percentage = (correct_answers / total_questions) * 100
-                
-                st.session_state.post_quiz_completed = True
-                st.session_state.post_quiz_score = score_percentage
-                st.session_state.current_section = 0  # 다음 사용자를 위해 초기화
-                
-                st.success(f"사후 퀴즈가 제출되었습니다! 점수: {correct_answers}/{total_questions} ({score_percentage:.1f}%)")
-                
-                # 점수에 따른 피드백
-                if score_percentage >= 80:
-                    st.markdown("""
-                    <div class="success-box">
-                        <h4>🎉 훌륭합니다!</h4>
-                        <p>로봇수술에 대한 이해도가 매우 높습니다. 이제 자신감을 가지고 수술에 임하실 수 있습니다.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                elif score_percentage >= 60:
-                    st.markdown("""
-                    <div class="info-box">
-                        <h4>👍 잘하셨습니다!</h4>
-                        <p>로봇수술에 대한 기본적인 이해를 잘 하셨습니다. 추가 질문이 있으시면 언제든 물어보세요.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown("""
-                    <div class="warning-box">
-                        <h4>📚 더 공부해보세요</h4>
-                        <p>로봇수술에 대한 이해를 더 높이기 위해 정보를 다시 읽어보시거나 질문해보세요.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                st.rerun()
+            st.metric("FAQ 조회", faq_stats['lookups'])
+        with col3:
+            st.metric("글자 일치", faq_stats['lexical_hits'])
+        with col4:
+            st.metric("의미 일치", faq_stats['semantic_hits'])
+    
+    # 분할별 캐시를 합산
+    cache_stats = [cache.stats() for cache in list(get_answer_caches().values())]
+    cache_hits = sum(stats['hits'] for stats in cache_stats)
+    cache_lookups = cache_hits + sum(stats['misses'] for stats in cache_stats)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("캐시 적중률", f"{(cache_hits / cache_lookups if cache_lookups else 0.0) * 100:.1f}%")
+    with col2:
+        st.metric("캐시 항목", sum(stats['entries'] for stats in cache_stats))
+    with col3:
+        st.metric("캐시 조회", cache_lookups)
+    
+    coalescer_stats = get_chat_coalescer().stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("OpenAI 호출", coalescer_stats['upstream_calls'])
+    with col2:
+        st.metric("합쳐진 요청", coalescer_stats['coalesced'])
+    with col3:
+        st.metric("절약 비율", f"{coalescer_stats['saved_ratio'] * 100:.1f}%")
+    st.caption("FAQ와 답변 캐시는 이전 대화 없이 들어온 질문에만 사용하며, 답변 캐시 조회는 FAQ에서 찾지 못한 질문에 대해서만 이루어집니다. 답변 캐시는 수술 유형(검색 분할)별로 따로 보관합니다. 합쳐진 요청은 같은 질문이 처리되는 동안 들어와 그 응답을 함께 받은 요청입니다. 값은 서버 프로세스가 시작된 이후 누적값입니다.")
+
+# LLM 호출 대기열 상태 (진행 중, 대기 중, 거절된 요청)
+def render_chat_scheduler_stats():
+    scheduler = get_chat_scheduler()
+    stats = scheduler.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("진행 중", f"{stats['running']} / {scheduler.max_concurrency}")
+    with col2:
+        st.metric("대기 중", stats['waiting'])
+    with col3:
+        st.metric("거절", stats['rejected'])
+    with col4:
+        st.metric("평균 처리 시간", f"{stats['service_time']:.1f}초")
+    st.caption(f"최대 대기 {stats['peak_waiting']}건, 누적 시작 {stats['admitted']}건. 대기열이 {scheduler.max_queue}건을 넘으면 새 질문은 바로 거절됩니다.")
+
+# OpenAI 클라이언트 상태 (요청, 재시도, 실패 횟수와 연결 풀 사용량)
+def render_llm_client_stats():
+    stats = client.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("HTTP 요청", stats['requests'])
+    with col2:
+        st.metric("재시도", stats['retries'])
+    with col3:
+        st.metric("실패", stats['failures'])
+    with col4:
+        st.metric("연결 풀", f"{stats['pool_connections']} (유휴 {stats['pool_idle_connections']})")
+    st.caption(f"응답 대기 중인 요청 {stats['in_flight']}건 (최대 {stats['peak_in_flight']}건). 재시도 후에도 실패한 요청만 실패로 셉니다. 값은 서버 프로세스가 시작된 이후 누적값입니다.")
+
+# 현재 서버에 연결된 세션들의 상태 (연결이 끊겨 재접속을 기다리는 세션은 제외, Streamlit 내부 API를 사용하므로 실패하면 현재 세션만 반환)
+def list_session_states():
+    try:
+        from streamlit.runtime import Runtime
+        session_infos = Runtime.instance()._session_mgr.list_active_sessions()
+        states = [info.session.session_state.filtered_state for info in session_infos]
+    except Exception:
+        states = []
+    return states or [st.session_state.to_dict()]
+
+# 세션별 메모리 사용량 (세션 상태의 키별 크기 합계)
+def render_session_memory():
+    report = session_memory_report(list_session_states(), shared=PackedAnswers.shared_objects())
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("활성 세션", report['sessions'])
+    with col2:
+        st.metric("평균 (KB)", f"{report['mean'] / 1024:.1f}")
+    with col3:
+        st.metric("최대 (KB)", f"{report['max'] / 1024:.1f}")
+    
+    st.dataframe(
+        [
+            {
+                "키": key,
+                "합계 (KB)": round(size / 1024, 1),
+                "세션당 평균 (KB)": round(size / 1024 / report['sessions'], 2)
+            }
+            for key, size in report['by_key'].items()
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption(f"세션 상태에 들어 있는 객체의 크기 합계입니다. 채팅은 최근 {CHAT_HISTORY_LIMIT}개 메시지만 세션에 남기고 이전 메시지는 저장소에 보관합니다.")
 
 # 관리자 대시보드
+@profiler.timed()
 def render_admin_dashboard():
     st.markdown("""
     <div class="section-header">
@@ -1058,24 +812,10 @@ def render_admin_dashboard():
     </div>
     """, unsafe_allow_html=True)
     
-    # 현재 사용자 데이터 저장
-    if st.session_state.get('profile_setup_completed', False):
-        current_user_data = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "profile": st.session_state.get('user_profile', {}),
-            "pre_quiz_answers": st.session_state.get('quiz_answers', {}),
-            "post_quiz_answers": st.session_state.get('post_quiz_answers', {}),
-            "pre_quiz_completed": st.session_state.get('pre_quiz_completed', False),
-            "post_quiz_completed": st.session_state.get('post_quiz_completed', False),
-            "post_quiz_score": st.session_state.get('post_quiz_score', 0)
-        }
-        
-        # 중복 방지를 위해 기존 데이터 확인
-        if current_user_data not in st.session_state.all_users_data:
-            st.session_state.all_users_data.append(current_user_data)
+    store = get_participant_store()
     
     # 탭으로 관리자 기능 구성
-    tab1, tab2, tab3 = st.tabs(["📊 전체 통계", "👥 사용자 목록", "📝 상세 답변"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 전체 통계", "👥 사용자 목록", "📝 상세 답변", "⏱️ 성능"])
     
     with tab1:
         st.markdown("""
@@ -1084,9 +824,10 @@ def render_admin_dashboard():
         </div>
         """, unsafe_allow_html=True)
         
-        total_users = len(st.session_state.all_users_data)
-        completed_pre_quiz = sum(1 for user in st.session_state.all_users_data if user.get('pre_quiz_completed', False))
-        completed_post_quiz = sum(1 for user in st.session_state.all_users_data if user.get('post_quiz_completed', False))
+        summary = store.summary()
+        total_users = summary['total_users']
+        completed_pre_quiz = summary['completed_pre_quiz']
+        completed_post_quiz = summary['completed_post_quiz']
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -1101,22 +842,54 @@ def render_admin_dashboard():
         
         with col4:
             if completed_post_quiz > 0:
-                avg_score = sum(user.get('post_quiz_score', 0) for user in st.session_state.all_users_data if user.get('post_quiz_completed', False)) / completed_post_quiz
+                avg_score = summary['avg_score']
                 st.metric("평균 점수", f"{avg_score:.1f}%")
             else:
                 st.metric("평균 점수", "N/A")
         
         # 성별 분포
         if total_users > 0:
-            gender_data = {}
-            for user in st.session_state.all_users_data:
-                gender = user.get('profile', {}).get('gender', '미입력')
-                gender_data[gender] = gender_data.get(gender, 0) + 1
+            gender_data = summary['histograms']['gender']
             
             st.markdown("### 성별 분포")
             for gender, count in gender_data.items():
                 percentage = (count / total_users) * 100
                 st.write(f"{gender}: {count}명 ({percentage:.1f}%)")
+            
+            # 문항 분석 (정답률, 변별도, 향상도, 보기 선택 분포)
+            item_stats, distractors, counts = get_item_analysis(store.data_version())
+            
+            st.markdown("### 문항 분석")
+            st.caption(
+                f"사전 퀴즈 {counts['pre']}명, 사후 퀴즈 {counts['post']}명, "
+                f"사전·사후 모두 완료 {counts['paired']}명 기준. "
+                "변별도는 총점 상위 27%와 하위 27% 집단의 정답률 차이입니다."
+            )
+            st.dataframe(
+                item_stats.style.format(
+                    {column: "{:.2f}" for column in item_stats.columns if column != "문항"},
+                    na_rep="-"
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            st.markdown("### 보기 선택 분포")
+            quiz_label = st.radio(
+                "퀴즈 선택",
+                ["사후 퀴즈", "사전 퀴즈"],
+                horizontal=True,
+                key="admin_distractor_quiz"
+            )
+            distractor_table = distractors["post" if quiz_label == "사후 퀴즈" else "pre"]
+            st.dataframe(
+                distractor_table.style.format(
+                    {column: "{:.1%}" for column in distractor_table.columns if column.startswith("보기")},
+                    na_rep="-"
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
     
     with tab2:
         st.markdown("""
@@ -1125,18 +898,9 @@ def render_admin_dashboard():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.all_users_data:
-            for i, user in enumerate(st.session_state.all_users_data):
-                with st.expander(f"사용자 {i+1} - {user.get('timestamp', 'N/A')}"):
-                    profile = user.get('profile', {})
-                    st.write(f"**나이**: {profile.get('age', 'N/A')}")
-                    st.write(f"**성별**: {profile.get('gender', 'N/A')}")
-                    st.write(f"**교육수준**: {profile.get('education', 'N/A')}")
-                    st.write(f"**수술 유형**: {profile.get('medical_experience', 'N/A')}")
-                    st.write(f"**사전 퀴즈 완료**: {'✅' if user.get('pre_quiz_completed', False) else '❌'}")
-                    st.write(f"**사후 퀴즈 완료**: {'✅' if user.get('post_quiz_completed', False) else '❌'}")
-                    if user.get('post_quiz_completed', False):
-                        st.write(f"**사후 퀴즈 점수**: {user.get('post_quiz_score', 0):.1f}%")
+        page_records = []
+        if total_users > 0:
+            page_records = render_participant_list(store)
         else:
             st.write("아직 사용자 데이터가 없습니다.")
     
@@ -1147,16 +911,32 @@ def render_admin_dashboard():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.all_users_data:
-            selected_user = st.selectbox(
-                "사용자 선택",
-                [f"사용자 {i+1} - {user.get('timestamp', 'N/A')}" for i, user in enumerate(st.session_state.all_users_data)],
-                key="admin_user_select"
-            )
+        if total_users > 0:
+            # 참가자 ID로 찾기 (입력이 없으면 사용자 목록의 현재 페이지에서 선택)
+            id_query = st.text_input(
+                "참가자 ID",
+                key="admin_user_id",
+                placeholder="ID 앞부분만 입력해도 됩니다"
+            ).strip()
+            candidates = store.find_by_id_prefix(id_query) if id_query else page_records
+            
+            if not candidates:
+                st.write("해당 ID의 참가자가 없습니다.")
+                selected_user_id = None
+            else:
+                user_labels = {
+                    user['id']: f"{user['id'][:8]} - {user.get('timestamp', 'N/A')}"
+                    for user in candidates
+                }
+                selected_user_id = st.selectbox(
+                    "사용자 선택",
+                    list(user_labels.keys()),
+                    format_func=user_labels.get,
+                    key="admin_user_select"
+                )
             
-            if selected_user:
-                user_index = int(selected_user.split()[1]) - 1
-                user = st.session_state.all_users_data[user_index]
+            if selected_user_id:
+                user = store.get(selected_user_id)
                 
                 col1, col2 = st.columns(2)
                 
@@ -1194,80 +974,99 @@ def render_admin_dashboard():
         else:
             st.write("분석할 사용자 데이터가 없습니다.")
     
+    with tab4:
+        st.markdown("""
+        <div class="info-box">
+            <h4>화면별 처리 시간</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        if not profiler.enabled:
+            st.write("성능 측정이 꺼져 있습니다. CONSENT_PROFILING=1 환경 변수를 설정하고 앱을 다시 시작하세요.")
+        else:
+            render_profiling_stats()
+        
+        st.markdown("""
+        <div class="info-box">
+            <h4>답변 재사용</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        render_answer_reuse_stats()
+        
+        st.markdown("""
+        <div class="info-box">
+            <h4>LLM 호출 대기열</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        render_chat_scheduler_stats()
+        
+        st.markdown("""
+        <div class="info-box">
+            <h4>OpenAI 연결</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        render_llm_client_stats()
+        
+        st.markdown("""
+        <div class="info-box">
+            <h4>세션별 메모리</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        render_session_memory()
+    
     # 데이터 내보내기
     st.markdown("---")
     st.markdown("### 데이터 내보내기")
     
-    if st.button("CSV 파일로 내보내기", key="export_csv"):
-        import pandas as pd
+    # 고른 형식 하나만 만들어 다운로드 버튼에 전달 (버튼은 파일 전체를 메모리에 올리므로 한 파일만 유지)
+    export_format = st.radio("파일 형식", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    st.caption("다운로드 버튼은 만든 파일 전체를 서버 메모리에 보관하므로, 참가자가 많으면 파일 크기만큼 메모리를 사용합니다.")
+    
+    if st.button(f"{export_format} 파일로 내보내기", key="export_data"):
+        question_ids = [q_data['id'] for q_data in iter_questions(get_quiz_bank())]
+        file_name, mime = EXPORT_FORMATS[export_format]
         
-        # 데이터를 DataFrame으로 변환
-        export_data = []
-        for user in st.session_state.all_users_data:
-            profile = user.get('profile', {})
-            row = {
-                'timestamp': user.get('timestamp', ''),
-                'age': profile.get('age', ''),
-                'gender': profile.get('gender', ''),
-                'education': profile.get('education', ''),
-                'medical_experience': profile.get('medical_experience', ''),
-                'pre_quiz_completed': user.get('pre_quiz_completed', False),
-                'post_quiz_completed': user.get('post_quiz_completed', False),
-                'post_quiz_score': user.get('post_quiz_score', 0)
-            }
-            
-            # 퀴즈 답변 추가
-            pre_answers = user.get('pre_quiz_answers', {})
-            post_answers = user.get('post_quiz_answers', {})
+        # 임시 폴더에 나눠 기록한 뒤 완성된 파일만 다운로드 버튼에 전달
+        with tempfile.TemporaryDirectory() as export_dir:
+            export_path = os.path.join(export_dir, file_name)
+            exported = write_export(store, question_ids, export_path, export_format)
             
-            for q_id in range(1, 11):
-                row[f'pre_q{q_id}'] = pre_answers.get(f'q{q_id}', '')
-                row[f'post_q{q_id}'] = post_answers.get(f'pq{q_id}', '')
-            
-            export_data.append(row)
-        
-        if export_data:
-            df = pd.DataFrame(export_data)
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="CSV 다운로드",
-                data=csv,
-                file_name=f"robot_surgery_quiz_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.warning("내보낼 데이터가 없습니다.")
+            if exported > 0:
+                file_prefix = f"robot_surgery_quiz_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                st.write(f"{exported}명의 데이터를 내보냈습니다.")
+                with open(export_path, "rb") as f:
+                    st.download_button(
+                        label=f"{export_format} 다운로드",
+                        data=f,
+                        file_name=f"{file_prefix}{os.path.splitext(file_name)[1]}",
+                        mime=mime,
+                        on_click="ignore"
+                    )
+            else:
+                st.warning("내보낼 데이터가 없습니다.")
 
 # 메인 페이지
+@profiler.timed()
 def render_main_page():
     # Streamlit 앱의 주 콘텐츠를 렌더링합니다.
     # st.title("메인 페이지") # 중복 제목 제거
 
-    # 이미지 중앙 정렬을 위한 컨테이너와 CSS
-    st.markdown("""
-    <style>
-        .image-center-container {
-            display: flex;
-            justify-content: center;
-            width: 100%;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-
+    # 이미지 중앙 정렬을 위한 컨테이너
     with st.container():
         st.markdown("<div class='image-center-container'>", unsafe_allow_html=True)
-        st.image("https://i.imgur.com/g8o2p1f.png", use_column_width=False)
+        # build_assets.py로 내려받아 만든 파일을 사용 (아직 만들지 않았으면 원본 주소에서 표시)
+        main_image = load_image_asset("main_page", 600)
+        if main_image is not None:
+            st.image(main_image, width=600, output_format="PNG")
+        else:
+            st.image("https://i.imgur.com/g8o2p1f.png", width=600)
         st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("""
-    <style>
-    .main-page-text {
-        font-size: 1.5rem;
-        text-align: center;
-        margin-top: 1rem;
-        margin-bottom: 2rem;
-    }
-    </style>
     <div class="main-page-text">
         이 앱은 로봇수술 동의서의 내용을 쉽게 이해하고, 관련 지식을 습득하며, 궁금한 점을 질문할 수 있도록 돕기 위해 개발되었습니다.<br>
         사이드바 메뉴를 통해 각 기능에 접근할 수 있습니다.
@@ -1322,6 +1121,7 @@ def render_main_page():
         st.rerun()
 
 # 메인 콘텐츠
+@profiler.timed()
 def render_main_content():
     st.markdown("""
     <div class="section-header">
@@ -1402,7 +1202,71 @@ def render_main_content():
         </div>
         """, unsafe_allow_html=True)
 
+# 같은 요청인지 판단하는 키 (질문은 정규화하고 나머지 문맥은 그대로 비교)
+def chat_request_key(messages):
+    return json.dumps([normalize_prompt(messages[-1]['content']), messages[:-1]], ensure_ascii=False)
+
+# LLM 호출 차례 대기 (기다리는 동안 대기 순서와 예상 시간 표시)
+# 호출 슬롯은 응답을 만드는 스레드가 잡고 놓으므로 여기서는 시작될 때까지 표시만 함
+def wait_for_chat_slot(ticket):
+    status = None
+    while not ticket.wait(0 if status is None else 0.5):
+        status = status or st.empty()
+        status.info(f"⏳ 질문이 많아 순서를 기다리고 있습니다. 대기 순서: {ticket.position()}번째 (약 {ticket.eta():.0f}초)")
+    if status is not None:
+        status.empty()
+
+# 채팅 응답 구독 (같은 요청이 진행 중이거나 대기 중이면 함께 받고, 새 요청이면 대기열에 등록)
+# 대기열이 가득 차면 QueueFull, 다 받았거나 그만 받을 때 close() 호출
+def subscribe_chat_response(messages):
+    session_id = st.session_state.get('participant_id', '')
+    return get_chat_coalescer().stream(
+        chat_request_key(messages),
+        lambda: request_chat_tokens(messages),
+        admit=lambda: get_chat_scheduler().submit(session_id)
+    )
+
+# OpenAI 스트리밍 응답의 토큰
+def request_chat_tokens(messages):
+    stream = client.chat_completion(
+        model="gpt-3.5-turbo",
+        messages=messages,
+        max_tokens=500,
+        temperature=0.7,
+        stream=True
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if token:
+            yield token
+
+# 스트리밍 응답 생성 (timings에 첫 토큰 지연과 전체 응답 시간을 초 단위로 기록)
+def stream_chat_response(subscription, timings):
+    start = time.perf_counter()
+    for token in subscription:
+        if 'ttft' not in timings:
+            timings['ttft'] = time.perf_counter() - start
+        yield token
+    timings['latency'] = time.perf_counter() - start
+    if 'ttft' in timings:
+        profiler.record("openai.chat_completion.ttft", timings['ttft'])
+    profiler.record("openai.chat_completion", timings['latency'])
+
+# 채팅 메시지 추가 (최근 CHAT_HISTORY_LIMIT개만 세션에 두고 이전 메시지는 저장소에 보관)
+def append_chat_message(message):
+    log_event("chat_message", **message)
+    history = st.session_state.chat_history
+    history.append(message)
+    overflow = len(history) - CHAT_HISTORY_LIMIT
+    if overflow > 0 and 'participant_id' in st.session_state:
+        get_participant_store().append_messages(st.session_state.participant_id, history[:overflow])
+        del history[:overflow]
+        st.session_state.chat_spilled += overflow
+
 # 챗봇 기능
+@profiler.timed()
 def render_chatbot():
     st.markdown("""
     <div class="section-header">
@@ -1417,6 +1281,19 @@ def render_chatbot():
     </div>
     """, unsafe_allow_html=True)
     
+    render_chat_pane()
+
+# 채팅 영역 (질문을 보내면 이 부분만 다시 실행)
+@st.fragment
+@profiler.timed()
+def render_chat_pane():
+    # 세션에서 옮겨진 이전 대화 (켰을 때만 저장소에서 읽어 표시)
+    if st.session_state.chat_spilled:
+        if st.toggle(f"이전 대화 {st.session_state.chat_spilled}개 보기", key="chat_show_earlier"):
+            for message in get_participant_store().messages(st.session_state.participant_id):
+                with st.chat_message(message["role"]):
+                    st.write(message["content"])
+    
     # 채팅 히스토리 표시
     for message in st.session_state.chat_history:
         with st.chat_message(message["role"]):
@@ -1424,36 +1301,109 @@ def render_chatbot():
     
     # 사용자 입력
     if prompt := st.chat_input("질문을 입력하세요..."):
+        previous_turns = list(st.session_state.chat_history)
+        
         # 사용자 메시지 추가
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+        append_chat_message({"role": "user", "content": prompt})
         
         with st.chat_message("user"):
             st.write(prompt)
         
-        # AI 응답 생성
+        # AI 응답 생성 (자주 묻는 질문이나 캐시에 비슷한 질문이 있으면 바로 답변, 없으면 토큰이 도착하는 대로 표시)
         with st.chat_message("assistant"):
-            with st.spinner("답변을 생성하고 있습니다..."):
-                try:
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
-                            {"role": "system", "content": "당신은 로봇수술 전문 상담사입니다. 친절하고 정확한 정보를 제공해 주세요."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=500,
-                        temperature=0.7
-                    )
+            try:
+                # 참가자의 수술 유형 (동의서 검색 분할과 답변 캐시를 고르는 데 사용)
+                shard = st.session_state.get('user_profile', {}).get('medical_experience')
+                answer_cache = get_answer_cache(shard)
+                faq_bank = get_faq_bank()
+                start = time.perf_counter()
+                
+                faq_entry, cached_answer, prompt_vector = None, None, None
+                # 이전 대화가 있으면 질문이 앞 대화를 가리킬 수 있으므로("그건 얼마나 걸리나요?")
+                # 자주 묻는 질문과 캐시를 건너뛰고 대화 맥락과 함께 답변 생성
+                if not previous_turns:
+                    # 자주 묻는 질문은 글자 비교로 먼저 확인 (임베딩 호출 없음)
+                    faq_entry = faq_bank.match_lexical(prompt) if faq_bank is not None else None
+                    if faq_entry is None:
+                        try:
+                            cached_answer, prompt_vector = answer_cache.get(prompt)
+                        except Exception:
+                            pass
+                        if cached_answer is None and faq_bank is not None and prompt_vector is not None:
+                            faq_entry = faq_bank.match_vector(prompt_vector)
+                    if faq_entry is not None:
+                        cached_answer = faq_entry['answer']
+                
+                if cached_answer is not None:
+                    st.write(cached_answer)
+                    ai_response = cached_answer
+                    latency = time.perf_counter() - start
+                    timings = {'ttft': latency, 'latency': latency}
+                    if faq_entry is not None:
+                        profiler.record("chat.faq_answer", latency)
+                else:
+                    # 질문과 관련된 동의서 문단 검색 (참가자의 수술 유형 분할과 공통 분할)
+                    passages = []
+                    retrieval_index = get_retrieval_index()
+                    if retrieval_index is not None and previous_turns:
+                        # 이어지는 질문은 직전 질문과 함께 임베딩하여 검색
+                        last_question = next(
+                            (turn['content'] for turn in reversed(previous_turns) if turn['role'] == 'user'), ""
+                        )
+                        try:
+                            prompt_vector = embed_text(f"{last_question}\n{prompt}".strip())
+                        except Exception:
+                            pass
+                    if retrieval_index is not None and prompt_vector is not None:
+                        passages = retrieval_index.search(
+                            prompt_vector,
+                            shard=shard,
+                            top_k=int(os.environ.get("RAG_TOP_K", "3"))
+                        )
                     
-                    ai_response = response.choices[0].message.content
-                    st.write(ai_response)
+                    # 최근 대화, 이전 대화 요약, 검색 문단을 토큰 예산 안에서 구성
+                    messages, prompt_tokens = build_context(
+                        "당신은 로봇수술 전문 상담사입니다. 친절하고 정확한 정보를 제공해 주세요.",
+                        previous_turns,
+                        prompt,
+                        passages,
+                        budget=int(os.environ.get("CHAT_CONTEXT_BUDGET", "3000"))
+                    )
                     
-                    # AI 응답을 히스토리에 추가
-                    st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+                    timings = {'prompt_tokens': prompt_tokens}
+                    subscription = subscribe_chat_response(messages)
+                    try:
+                        if subscription.ticket is not None:
+                            wait_for_chat_slot(subscription.ticket)
+                        ai_response = st.write_stream(stream_chat_response(subscription, timings))
+                    finally:
+                        subscription.close()
                     
-                except Exception as e:
-                    st.error(f"응답 생성 중 오류가 발생했습니다: {str(e)}")
+                    # 이전 대화에 의존하지 않는 답변만 캐시에 저장
+                    if not previous_turns:
+                        try:
+                            answer_cache.put(prompt, ai_response, prompt_vector)
+                        except Exception:
+                            pass
+                
+                # AI 응답을 히스토리에 추가 (첫 토큰 지연과 전체 응답 시간 포함)
+                append_chat_message({
+                    "role": "assistant",
+                    "content": ai_response,
+                    "ttft": timings.get('ttft'),
+                    "latency": timings.get('latency'),
+                    "prompt_tokens": timings.get('prompt_tokens', 0),
+                    "cached": cached_answer is not None,
+                    "faq": faq_entry['id'] if faq_entry is not None else None
+                })
+                
+            except QueueFull:
+                st.warning("지금은 질문하시는 분이 많아 답변을 드리기 어렵습니다. 잠시 후 다시 질문해 주세요.")
+            except Exception as e:
+                st.error(f"응답 생성 중 오류가 발생했습니다: {str(e)}")
 
 # 사이드바 관리자 설정
+@profiler.timed()
 def render_sidebar_admin():
     st.sidebar.markdown("""
     <div style="text-align: center; padding: 1rem; background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); border-radius: 10px; margin-bottom: 1rem;">
@@ -1469,23 +1419,14 @@ def render_sidebar_admin():
         # 관리자 모드에서만 색상 선택 기능 표시
         st.sidebar.markdown("### 🎨 테마 색상")
         
-        color_options = {
-            "초록색 (의료)": ("#4CAF50", "#45a049"),
-            "파란색 (신뢰)": ("#667eea", "#764ba2"),
-            "보라색 (고급)": ("#9c27b0", "#673ab7"),
-            "주황색 (따뜻)": ("#ff9800", "#f57c00"),
-            "빨간색 (강조)": ("#f44336", "#d32f2f"),
-            "청록색 (차분)": ("#00bcd4", "#009688")
-        }
-        
         # 색상 선택 상태 초기화
         if 'selected_color' not in st.session_state:
-            st.session_state.selected_color = "초록색 (의료)"
+            st.session_state.selected_color = DEFAULT_THEME
         
         selected_color_name = st.sidebar.selectbox(
             "헤더 색상 선택",
-            list(color_options.keys()),
-            index=list(color_options.keys()).index(st.session_state.selected_color),
+            list(THEME_COLORS.keys()),
+            index=list(THEME_COLORS.keys()).index(st.session_state.selected_color),
             key="color_selector"
         )
         
@@ -1502,6 +1443,7 @@ def render_sidebar_admin():
         st.session_state.admin_mode = False
 
 # 메인 앱 실행
+@profiler.timed()
 def main():
     render_app_header()
 
@@ -1547,33 +1489,22 @@ def main():
     """, unsafe_allow_html=True)
 
 # 앱 헤더 렌더링 (메인 제목 및 이미지 포함)
+@profiler.timed()
 def render_app_header():
-    # 선택된 색상 가져오기 (기본값: 초록색)
-    selected_colors = ("#4CAF50", "#45a049")
-    if st.session_state.get('admin_mode', False) and 'selected_color' in st.session_state:
-        color_options = {
-            "초록색 (의료)": ("#4CAF50", "#45a049"),
-            "파란색 (신뢰)": ("#667eea", "#764ba2"),
-            "보라색 (고급)": ("#9c27b0", "#673ab7"),
-            "주황색 (따뜻)": ("#ff9800", "#f57c00"),
-            "빨간색 (강조)": ("#f44336", "#d32f2f"),
-            "청록색 (차분)": ("#00bcd4", "#009688")
-        }
-        selected_colors = color_options.get(st.session_state.selected_color, selected_colors)
-
-    # 메인 헤더 컨테이너 (이미지와 텍스트 포함)
-    st.markdown(f"""
-    <div class="main-header" style="background: linear-gradient(90deg, {selected_colors[0]} 0%, {selected_colors[1]} 100%);">
-        <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; padding: 1rem;">
+    # 메인 헤더 컨테이너 (이미지와 텍스트 포함, 색상은 스타일시트의 테마 변수 사용)
+    st.markdown("""
+    <div class="main-header themed">
+        <div class="header-content">
     """, unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1,2,1])
     with col2:
-        st.image("images/robot_doctor_logo.png", width=200, use_container_width=False)
+        logo = load_image_asset("robot_doctor_logo", 200) or "images/robot_doctor_logo.png"
+        st.image(logo, width=200, use_container_width=False, output_format="PNG")
     
     st.markdown("""
-            <h1 style="font-size: 3rem !important; font-weight: bold !important; color: white !important; margin: 0;">로봇수술동의서 이해쑥쑥</h1>
-            <p style="font-size: 1.5rem !important; color: white !important; margin: 0;">로봇수술에 대한 이해를 도와드리겠습니다.</p>
+            <h1>로봇수술동의서 이해쑥쑥</h1>
+            <p>로봇수술에 대한 이해를 도와드리겠습니다.</p>
         </div>
     </div>
     """, unsafe_allow_html=True)
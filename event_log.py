@@ -0,0 +1,158 @@
+import atexit
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# 상호작용 이벤트 로그 (추가 전용, 세그먼트 파일 단위로 교체)
+# 이벤트는 메모리 버퍼에 쌓고 백그라운드 스레드가 모아서 기록하므로 화면 처리가 디스크 I/O를 기다리지 않습니다.
+# 프로세스마다 자기 세그먼트 파일에만 쓰며, replay_events.py가 모든 세그먼트를 시간 순으로 합쳐 상태를 다시 만듭니다.
+
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class EventLog:
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, batch_size=500, flush_interval=1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._segment = None
+        self._segment_size = 0
+        self._segment_number = 0
+        # 같은 시각에 기록된 이벤트도 발생 순서를 유지하도록 일련번호 부여
+        self._sequence = 0
+        self.written = 0
+        self.segments = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._writer = threading.Thread(target=self._run_writer, name="event-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # 이벤트 추가 (버퍼에만 넣고 바로 반환)
+    def emit(self, event_type, participant_id, **fields):
+        with self._lock:
+            self._sequence += 1
+            self._buffer.append({
+                "ts": time.time(),
+                "seq": self._sequence,
+                "pid": os.getpid(),
+                "type": event_type,
+                "participant_id": participant_id,
+                **fields,
+            })
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    # 버퍼의 이벤트를 현재 세그먼트에 기록 (세그먼트가 segment_bytes를 넘으면 새 파일로 교체)
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            data = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch).encode("utf-8")
+            if self._segment is None or self._segment_size >= self.segment_bytes:
+                self._rotate()
+            self._segment.write(data)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._segment_size += len(data)
+            self.written += len(batch)
+            return len(batch)
+
+    def _rotate(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment_number += 1
+        name = f"events-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self._segment_number:06d}{SEGMENT_SUFFIX}"
+        self._segment = open(os.path.join(self.directory, name), "ab")
+        self._segment_size = 0
+        self.segments += 1
+
+    def stats(self):
+        with self._lock:
+            return {"buffered": len(self._buffer), "written": self.written, "segments": self.segments}
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+
+# 세그먼트 하나의 이벤트 (마지막 줄이 기록 도중 끊겼으면 건너뜀)
+def _iter_segment(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+# 모든 세그먼트의 이벤트를 시간 순으로 (각 세그먼트는 이미 시간 순이므로 병합만 수행)
+def iter_events(directory):
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith("events-") and name.endswith(SEGMENT_SUFFIX)
+    )
+    return heapq.merge(*(_iter_segment(path) for path in paths), key=lambda event: (event["ts"], event["pid"], event["seq"]))
+
+
+# 이벤트로 참가자별 상태 재구성: {참가자 ID: 상태}
+def replay(events):
+    states = {}
+    for event in events:
+        participant_id = event.get("participant_id")
+        if participant_id is None:
+            continue
+        state = states.setdefault(participant_id, {
+            "timestamp": None,
+            "profile": {},
+            "pre_quiz_answers": {},
+            "post_quiz_answers": {},
+            "current_section": 0,
+            "pre_quiz_completed": False,
+            "post_quiz_completed": False,
+            "post_quiz_score": 0,
+            "chat_messages": [],
+            "last_event_at": None,
+        })
+        event_type = event["type"]
+        if event_type == "profile_submitted":
+            state["timestamp"] = event["created_at"]
+            state["profile"] = event["profile"]
+        elif event_type == "answer_selected":
+            answers = state["pre_quiz_answers" if event["quiz"] == "pre" else "post_quiz_answers"]
+            answers[event["answer_key"]] = event["option"]
+        elif event_type == "section_changed":
+            state["current_section"] = event["to_section"]
+        elif event_type == "quiz_completed":
+            state[f"{event['quiz']}_quiz_completed"] = True
+            state["current_section"] = 0
+            if event["quiz"] == "post":
+                state["post_quiz_score"] = event["score"]
+        elif event_type == "chat_message":
+            state["chat_messages"].append({"role": event["role"], "content": event["content"]})
+        state["last_event_at"] = event["ts"]
+    return states
@@ -0,0 +1,81 @@
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# 참가자 데이터 내보내기 (CSV 또는 Parquet)
+# 저장소에서 chunk 단위로 읽은 행을 Arrow 배치로 바꿔 선택한 형식의 파일에 차례로 기록하므로,
+# 참가자 수가 많아도 전체 데이터를 한 번에 메모리에 올리지 않습니다.
+
+BASE_FIELDS = [
+    ("participant_id", pa.string()),
+    ("timestamp", pa.string()),
+    ("age", pa.string()),
+    ("gender", pa.string()),
+    ("education", pa.string()),
+    ("medical_experience", pa.string()),
+    ("pre_quiz_completed", pa.bool_()),
+    ("post_quiz_completed", pa.bool_()),
+    ("post_quiz_score", pa.float64()),
+]
+# 형식 이름: (파일 이름, MIME 형식)
+EXPORT_FORMATS = {
+    "CSV": ("participants.csv", "text/csv"),
+    "Parquet": ("participants.parquet", "application/vnd.apache.parquet"),
+}
+
+
+# 내보내기 열 구성: 기본 정보 뒤에 문항별 사전/사후 답변 (quiz_bank의 문항 ID 기준)
+def export_schema(question_ids):
+    fields = list(BASE_FIELDS)
+    for question_id in question_ids:
+        fields.append((f"pre_q{question_id}", pa.int8()))
+        fields.append((f"post_q{question_id}", pa.int8()))
+    return pa.schema(fields)
+
+
+# SQLite는 완료 여부를 0/1 정수로 돌려주므로 불리언 열은 정수 배열을 변환해서 생성
+def column_array(values, data_type):
+    if pa.types.is_boolean(data_type):
+        return pa.array(values, type=pa.int8()).cast(data_type)
+    return pa.array(values, type=data_type)
+
+
+# 저장소 행 묶음(store.iter_export_rows)을 Arrow 배치로 변환
+def iter_export_batches(store, question_ids, chunk_size=5000):
+    schema = export_schema(question_ids)
+    base_count = len(BASE_FIELDS)
+    question_count = len(question_ids)
+    # SQL 결과는 사전 답변 전체 다음에 사후 답변이 오므로 문항별로 번갈아 배치
+    order = list(range(base_count))
+    for i in range(question_count):
+        order += [base_count + i, base_count + question_count + i]
+
+    chunks = store.iter_export_rows(
+        [f"q{question_id}" for question_id in question_ids],
+        [f"pq{question_id}" for question_id in question_ids],
+        chunk_size=chunk_size
+    )
+    for rows in chunks:
+        columns = list(zip(*rows))
+        arrays = [column_array(columns[index], field.type) for index, field in zip(order, schema)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# 형식에 맞는 Arrow 기록기 생성 (Parquet은 zstd 압축)
+def open_writer(path, schema, file_format):
+    if file_format == "Parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa_csv.CSVWriter(path, schema)
+
+
+# 선택한 형식 하나만 한 번의 순회로 기록하고 내보낸 참가자 수 반환
+def write_export(store, question_ids, path, file_format="CSV", chunk_size=5000):
+    schema = export_schema(question_ids)
+    total = 0
+    with open_writer(path, schema, file_format) as writer:
+        for batch in iter_export_batches(store, question_ids, chunk_size):
+            writer.write_batch(batch)
+            total += batch.num_rows
+    return total
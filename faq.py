@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+
+import faiss
+import numpy as np
+
+from semantic_cache import normalize_prompt
+
+# 자주 묻는 질문 답변 (build_faq.py로 미리 만든 검토된 답변)
+# 질문이 들어오면 먼저 글자 단위로 비교하고, 비슷한 질문이 없으면 임베딩 유사도로 찾습니다.
+# 일치하면 OpenAI를 호출하지 않고 바로 답변합니다.
+
+FAQ_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json")
+FAQ_INDEX_FILE = "faq.faiss"
+FAQ_ENTRIES_FILE = "faq_entries.jsonl"
+
+
+def load_faq(path=FAQ_PATH):
+    with open(path, encoding="utf-8") as f:
+        faq = json.load(f)
+    validate_faq(faq)
+    return faq
+
+
+# 질문 목록 형식 검사
+def validate_faq(faq):
+    seen_ids = set()
+    for entry in faq.get("entries", []):
+        entry_id = entry.get("id")
+        if not entry_id or entry_id in seen_ids:
+            raise ValueError(f"FAQ ID가 없거나 중복되었습니다: {entry_id}")
+        seen_ids.add(entry_id)
+        if not entry.get("questions"):
+            raise ValueError(f"'{entry_id}' 항목에 질문이 없습니다.")
+        if entry.get("reviewed") and not entry.get("answer"):
+            raise ValueError(f"'{entry_id}' 항목은 검토 완료로 표시되었지만 답변이 없습니다.")
+
+
+# 글자 2-gram 집합 (띄어쓰기와 조사 차이에 덜 민감하도록 공백을 제거하고 비교)
+def char_bigrams(text):
+    text = normalize_prompt(text).replace(" ", "")
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+# 인덱스와 답변 저장 (벡터는 항목별 질문 순서대로)
+def write_faq_index(vectors, entries, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    faiss.write_index(index, os.path.join(output_dir, FAQ_INDEX_FILE))
+    with open(os.path.join(output_dir, FAQ_ENTRIES_FILE), "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class FAQBank:
+    def __init__(self, entries, index=None, lexical_threshold=0.7, semantic_threshold=0.9):
+        self.entries = entries
+        self.index = index
+        self.lexical_threshold = lexical_threshold
+        self.semantic_threshold = semantic_threshold
+        # 질문 문장별 (항목 번호, 정규화된 문장, 2-gram 집합), 인덱스의 벡터 순서와 같음
+        self._questions = []
+        self._exact = {}
+        for entry_number, entry in enumerate(entries):
+            for question in entry["questions"]:
+                key = normalize_prompt(question)
+                self._questions.append((entry_number, key, char_bigrams(question)))
+                self._exact.setdefault(key, entry_number)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.lexical_hits = 0
+        self.semantic_hits = 0
+
+    @classmethod
+    def load(cls, index_dir, **kwargs):
+        entries_path = os.path.join(index_dir, FAQ_ENTRIES_FILE)
+        if not os.path.exists(entries_path):
+            return None
+        with open(entries_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        index_path = os.path.join(index_dir, FAQ_INDEX_FILE)
+        index = faiss.read_index(index_path) if os.path.exists(index_path) else None
+        return cls(entries, index, **kwargs)
+
+    # 글자 단위 비교 (임베딩 없이 바로 확인, 일치하면 항목 반환)
+    def match_lexical(self, prompt):
+        with self._lock:
+            self.lookups += 1
+        key = normalize_prompt(prompt)
+        entry_number = self._exact.get(key)
+        if entry_number is None:
+            bigrams = char_bigrams(prompt)
+            best_score = 0.0
+            for number, _, question_bigrams in self._questions:
+                if not bigrams or not question_bigrams:
+                    continue
+                score = len(bigrams & question_bigrams) / len(bigrams | question_bigrams)
+                if score > best_score:
+                    entry_number, best_score = number, score
+            if best_score < self.lexical_threshold:
+                return None
+        with self._lock:
+            self.lexical_hits += 1
+        return self.entries[entry_number]
+
+    # 임베딩 유사도 비교 (vector는 단위 벡터, match_lexical에서 찾지 못한 질문에 사용)
+    def match_vector(self, vector):
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        query = np.asarray(vector, dtype="float32").reshape(1, -1)
+        scores, ids = self.index.search(query, 1)
+        if ids[0][0] < 0 or scores[0][0] < self.semantic_threshold:
+            return None
+        with self._lock:
+            self.semantic_hits += 1
+        return self.entries[self._questions[int(ids[0][0])][0]]
+
+    def stats(self):
+        with self._lock:
+            hits = self.lexical_hits + self.semantic_hits
+            return {
+                "entries": len(self.entries),
+                "lookups": self.lookups,
+                "lexical_hits": self.lexical_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.lookups - hits,
+                "hit_ratio": hits / self.lookups if self.lookups else 0.0,
+            }
@@ -0,0 +1,163 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+from llm_client import LLMClient
+from retrieval import (CHUNKS_FILE, EMBEDDING_MODEL, INDEX_FILE, VECTORS_FILE, chunk_text, embed_texts,
+                       extract_pages, read_shard, shard_of, write_index)
+
+# 동의서 PDF 색인 생성 (오프라인 실행)
+# 사용법: python ingest.py consent_docs/ --output index/
+# 진료과 폴더(consent_docs/산부인과/...)의 문서는 진료과별 분할(index/산부인과/)에,
+# 최상위 문서는 공통 분할(index/general/)에 저장합니다.
+# 이전 실행 결과가 있으면 바뀐 문서만 다시 처리합니다.
+# - 파일 내용의 해시가 같은 문서는 텍스트 추출과 문단 나누기를 건너뜁니다.
+# - 문단 내용의 해시가 같은 문단은 이전 임베딩을 그대로 사용합니다.
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# 문서 하나의 문단 목록 (프로세스 풀에서 실행)
+def process_document(path, source, max_tokens, overlap):
+    chunks = []
+    for page_number, text in extract_pages(path):
+        for chunk in chunk_text(text, max_tokens=max_tokens, overlap=overlap):
+            chunks.append({"source": source, "page": page_number, "text": chunk, "hash": chunk_hash(chunk)})
+    return chunks
+
+
+# 이전 실행 결과: (문서별 파일 해시, 문서별 문단 목록, 문단 해시별 벡터)
+# 문단 나누기 설정이 바뀌면 모든 문서를 다시 나누고, 임베딩 모델이 바뀌면 벡터도 다시 계산합니다.
+def load_previous(output_dir, settings):
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}, {}, {}
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    # 분할 이전 형식이거나 임베딩 모델이 바뀌었으면 처음부터 다시 생성
+    if "shards" not in manifest or manifest["settings"]["model"] != settings["model"]:
+        return {}, {}, {}
+
+    chunks, vectors_by_hash, missing = [], {}, set()
+    for shard in manifest["shards"]:
+        loaded = read_shard(os.path.join(output_dir, shard), mmap_mode=None)
+        if loaded is None:
+            # 분할 파일이 없거나 맞지 않으면 그 분할의 문서를 바뀐 문서로 처리
+            missing.add(shard)
+            continue
+        vectors, shard_chunks = loaded
+        vectors_by_hash.update((chunk["hash"], vector) for chunk, vector in zip(shard_chunks, vectors))
+        chunks.extend(shard_chunks)
+    if manifest["settings"] != settings:
+        return {}, {}, vectors_by_hash
+
+    chunks_by_source = {}
+    for chunk in chunks:
+        chunks_by_source.setdefault(chunk["source"], []).append(chunk)
+    documents = {
+        source: digest for source, digest in manifest["documents"].items() if shard_of(source) not in missing
+    }
+    return documents, chunks_by_source, vectors_by_hash
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동의서 PDF를 나누고 임베딩하여 검색 인덱스를 만듭니다.")
+    parser.add_argument("input_dir", help="동의서 PDF가 있는 폴더")
+    parser.add_argument("--output", default="index", help="인덱스를 저장할 폴더 (기본값: index)")
+    parser.add_argument("--max-tokens", type=int, default=400, help="문단당 최대 토큰 수")
+    parser.add_argument("--overlap", type=int, default=50, help="문단 사이에 겹치는 토큰 수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="문서 처리 프로세스 수 (기본값: CPU 수)")
+    parser.add_argument("--full", action="store_true", help="이전 결과를 무시하고 모든 문서를 다시 처리")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    settings = {"model": EMBEDDING_MODEL, "max_tokens": args.max_tokens, "overlap": args.overlap}
+    previous_documents, chunks_by_source, vectors_by_hash = ({}, {}, {}) if args.full else load_previous(args.output, settings)
+
+    paths = {
+        os.path.relpath(path, args.input_dir): path
+        for path in sorted(glob.glob(os.path.join(args.input_dir, "**", "*.pdf"), recursive=True))
+    }
+    documents = {source: file_hash(path) for source, path in paths.items()}
+    changed = [source for source, digest in documents.items() if previous_documents.get(source) != digest]
+    removed = [source for source in previous_documents if source not in documents]
+    if not changed and not removed:
+        print(f"바뀐 문서가 없습니다 ({len(documents)}개 문서).")
+        return
+
+    # 바뀐 문서만 여러 프로세스에서 텍스트 추출과 문단 나누기
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            source: pool.submit(process_document, paths[source], source, args.max_tokens, args.overlap)
+            for source in changed
+        }
+        for source, future in futures.items():
+            chunks_by_source[source] = future.result()
+            print(f"{source}: {len(chunks_by_source[source])}개 문단")
+
+    chunks = [chunk for source in sorted(documents) for chunk in chunks_by_source[source]]
+    if not chunks:
+        parser.error(f"{args.input_dir}에서 텍스트가 있는 PDF를 찾지 못했습니다.")
+
+    # 처음 보는 문단만 임베딩 (같은 내용의 문단은 한 번만 요청)
+    new_texts = {}
+    for chunk in chunks:
+        if chunk["hash"] not in vectors_by_hash:
+            new_texts.setdefault(chunk["hash"], chunk["text"])
+    if new_texts:
+        load_dotenv()
+        client = LLMClient(os.environ["OPENAI_API_KEY"])
+        vectors_by_hash.update(zip(new_texts, embed_texts(client, list(new_texts.values()))))
+
+    # 바뀐 문서가 있는 분할만 다시 저장 (문서가 모두 삭제된 분할과 분할 이전 형식의 인덱스 파일은 제거)
+    chunks_by_shard = {}
+    for chunk in chunks:
+        chunks_by_shard.setdefault(shard_of(chunk["source"]), []).append(chunk)
+    affected = {shard_of(source) for source in changed + removed}
+    for shard, shard_chunks in chunks_by_shard.items():
+        if shard not in affected:
+            continue
+        vectors = np.stack([vectors_by_hash[chunk["hash"]] for chunk in shard_chunks])
+        write_index(vectors, shard_chunks, os.path.join(args.output, shard))
+    for source in removed:
+        shard = shard_of(source)
+        if shard not in chunks_by_shard and os.path.isdir(os.path.join(args.output, shard)):
+            shutil.rmtree(os.path.join(args.output, shard))
+    for name in (INDEX_FILE, CHUNKS_FILE, VECTORS_FILE):
+        if os.path.exists(os.path.join(args.output, name)):
+            os.remove(os.path.join(args.output, name))
+    with open(os.path.join(args.output, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {"settings": settings, "documents": documents, "shards": sorted(chunks_by_shard)},
+            f, ensure_ascii=False, indent=2
+        )
+
+    print(
+        f"{len(documents)}개 문서 중 {len(changed)}개 변경, {len(removed)}개 삭제 / "
+        f"{len(chunks)}개 문단 중 {len(new_texts)}개 임베딩 / {time.perf_counter() - start:.1f}초"
+    )
+    print(f"{len(chunks)}개 문단을 {args.output}에 저장했습니다 (분할: {', '.join(sorted(chunks_by_shard))}).")
+
+
+if __name__ == "__main__":
+    main()
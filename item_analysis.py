@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 문항 분석 (관리자 대시보드)
+# 참가자 × 문항 답변 행렬(int8, 미응답은 -1)을 만들고 문항별 통계를 한 번에 계산합니다.
+
+UNANSWERED = -1
+# 변별도 계산에 사용하는 상위/하위 집단 비율
+GROUP_FRACTION = 0.27
+
+
+# 참가자 × 문항 답변 행렬 (프로세스당 하나, 바뀐 참가자의 행만 갱신)
+class AnswerMatrix:
+    def __init__(self, question_count):
+        self.question_count = question_count
+        # 열 구성: 사전 답변 × 문항 수, 사후 답변 × 문항 수, 사전 완료, 사후 완료
+        self._data = np.empty((0, question_count * 2 + 2), dtype=np.int8)
+        self._row_index = {}
+        # 지금까지 읽은 기록의 가장 큰 데이터 버전 (이보다 큰 버전만 다시 읽음)
+        self.version = None
+        self._lock = threading.Lock()
+
+    # chunks는 store.iter_answer_rows(..., since=self.version)가 반환하는 행 묶음
+    def refresh(self, chunks):
+        with self._lock:
+            for rows in chunks:
+                values = np.array([row[2:] for row in rows], dtype=np.int8)
+                new_rows = []
+                for offset, row in enumerate(rows):
+                    participant_id, version = row[0], row[1]
+                    if self.version is None or version > self.version:
+                        self.version = version
+                    index = self._row_index.get(participant_id)
+                    if index is None:
+                        self._row_index[participant_id] = len(self._data) + len(new_rows)
+                        new_rows.append(offset)
+                    else:
+                        self._data[index] = values[offset]
+                if new_rows:
+                    self._data = np.concatenate([self._data, values[new_rows]])
+
+    # (사전 답변, 사후 답변, 사전 완료, 사후 완료) 복사본
+    def matrices(self):
+        with self._lock:
+            data = self._data.copy()
+        count = self.question_count
+        return (
+            data[:, :count],
+            data[:, count:count * 2],
+            data[:, -2].astype(bool),
+            data[:, -1].astype(bool),
+        )
+
+
+# 문항별 정답률 (응답한 사람 중 정답 비율, 응답자가 없으면 NaN)
+def difficulty(matrix, answer_key):
+    answered = (matrix != UNANSWERED).sum(axis=0)
+    correct = (matrix == answer_key).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(answered > 0, correct / answered, np.nan)
+
+
+# 변별도: 총점 상위 27% 집단과 하위 27% 집단의 정답률 차이
+def discrimination(matrix, answer_key, group_fraction=GROUP_FRACTION):
+    if len(matrix) < 2:
+        return np.full(matrix.shape[1], np.nan)
+    correct = matrix == answer_key
+    order = np.argsort(correct.sum(axis=1), kind="stable")
+    group_size = max(1, int(round(len(matrix) * group_fraction)))
+    lower = correct[order[:group_size]].mean(axis=0)
+    upper = correct[order[-group_size:]].mean(axis=0)
+    return upper - lower
+
+
+# 보기 선택 분포: 문항 × 보기 수 행렬 (문항별 응답자 대비 비율)
+def option_frequencies(matrix, option_count):
+    question_index = np.broadcast_to(np.arange(matrix.shape[1]), matrix.shape)
+    answered = (matrix >= 0) & (matrix < option_count)
+    flat = question_index[answered] * option_count + matrix[answered]
+    counts = np.bincount(flat, minlength=matrix.shape[1] * option_count).reshape(-1, option_count)
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, counts / totals, np.nan)
+
+
+# 사전/사후 퀴즈를 모두 마친 참가자의 문항별 향상도 (정답률 차이와 정규화 향상도)
+def pre_post_gain(pre, post, answer_key):
+    if len(pre) == 0:
+        empty = np.full(pre.shape[1], np.nan)
+        return empty, empty
+    pre_rate = (pre == answer_key).mean(axis=0)
+    post_rate = (post == answer_key).mean(axis=0)
+    gain = post_rate - pre_rate
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = np.where(pre_rate < 1, gain / (1 - pre_rate), np.nan)
+    return gain, normalized
+
+
+# 전체 문항 분석: (문항 통계 표, 사전/사후 보기 선택 분포 표, 참가자 수)
+def analyze_items(pre, post, pre_done, post_done, questions):
+    answer_key = np.array([question["correct"] for question in questions], dtype=np.int8)
+    option_count = max(len(question["options"]) for question in questions)
+    paired = pre_done & post_done
+    gain, normalized_gain = pre_post_gain(pre[paired], post[paired], answer_key)
+
+    item_stats = pd.DataFrame({
+        "문항": [question["id"] for question in questions],
+        "사전 정답률": difficulty(pre[pre_done], answer_key),
+        "사후 정답률": difficulty(post[post_done], answer_key),
+        "향상도": gain,
+        "정규화 향상도": normalized_gain,
+        "사전 변별도": discrimination(pre[pre_done], answer_key),
+        "사후 변별도": discrimination(post[post_done], answer_key),
+    })
+
+    distractors = {}
+    for name, matrix in (("pre", pre[pre_done]), ("post", post[post_done])):
+        table = pd.DataFrame(
+            option_frequencies(matrix, option_count),
+            columns=[f"보기 {i + 1}" for i in range(option_count)]
+        )
+        table.insert(0, "정답", answer_key.astype(int) + 1)
+        table.insert(0, "문항", item_stats["문항"])
+        distractors[name] = table
+
+    counts = {
+        "pre": int(pre_done.sum()),
+        "post": int(post_done.sum()),
+        "paired": int(paired.sum()),
+    }
+    return item_stats, distractors, counts
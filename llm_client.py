@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+# 프로세스 전체에서 공유하는 OpenAI 클라이언트
+# 연결 풀을 재사용하고, 429/5xx/연결 오류는 지터를 준 지수 백오프로 재시도합니다.
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # APITimeoutError 포함
+)
+
+
+class LLMClient:
+    def __init__(self, api_key, base_url=None, max_connections=20, max_keepalive_connections=10,
+                 connect_timeout=5.0, read_timeout=30.0, max_retries=4, backoff_base=0.5, backoff_max=8.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=60.0
+            ),
+            timeout=timeout,
+            event_hooks={"request": [self._on_request]}
+        )
+        # 재시도는 이 클래스에서 직접 처리하여 횟수를 집계합니다
+        self.openai = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self._http_client,
+            timeout=timeout,
+            max_retries=0
+        )
+
+    def chat_completion(self, **kwargs):
+        return self._with_retry(self.openai.chat.completions.create, **kwargs)
+
+    def embedding(self, **kwargs):
+        return self._with_retry(self.openai.embeddings.create, **kwargs)
+
+    def _with_retry(self, method, **kwargs):
+        attempt = 0
+        while True:
+            self._begin()
+            try:
+                return method(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._increment("failures")
+                    raise
+                delay = self._backoff_delay(attempt, e)
+            finally:
+                self._increment("in_flight", -1)
+            self._increment("retries")
+            time.sleep(delay)
+            attempt += 1
+
+    # 지수 백오프 + 전체 지터 (429 응답의 Retry-After가 더 길면 그 값을 따름)
+    def _backoff_delay(self, attempt, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return delay
+
+    def _increment(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    # 응답 헤더를 기다리는 요청 수 (스트리밍은 첫 응답까지)
+    def _begin(self):
+        with self._lock:
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+
+    def _on_request(self, request):
+        self._increment("requests")
+
+    # 요청/재시도 횟수와 연결 풀 사용량
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        pool = getattr(self._http_client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        stats["pool_connections"] = len(connections)
+        stats["pool_idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+        return stats
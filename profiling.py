@@ -0,0 +1,108 @@
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# 화면 렌더링과 OpenAI 호출 시간 측정 (CONSENT_PROFILING=1일 때만 동작)
+# 측정값은 로그 간격 버킷 히스토그램에 누적하여 세션 수와 관계없이 메모리 사용량이 일정합니다.
+
+
+class LatencyHistogram:
+    # 0.05ms ~ 120초 구간을 10% 간격 버킷으로 나눔 (백분위수 오차는 최대 10%)
+    def __init__(self, min_seconds=0.00005, max_seconds=120.0, growth=1.1):
+        self.min_seconds = min_seconds
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * (self._bucket(max_seconds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, seconds):
+        if seconds <= self.min_seconds:
+            return 0
+        return math.ceil(math.log(seconds / self.min_seconds) / self._log_growth)
+
+    def record(self, seconds):
+        self.counts[min(self._bucket(seconds), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    # 백분위수 (해당 버킷의 상한값)
+    def percentile(self, q):
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.min_seconds * self.growth ** bucket, self.max)
+        return self.max
+
+
+class Profiler:
+    # page_fn은 측정 시점의 화면 이름을 돌려주는 함수 (화면별로 따로 집계)
+    def __init__(self, enabled=False, page_fn=None):
+        self.enabled = enabled
+        self.page_fn = page_fn or (lambda: "")
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, page=None):
+        if not self.enabled:
+            return
+        key = (self.page_fn() if page is None else page, name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+        page = self.page_fn()
+        start = time.perf_counter()
+        yield
+        # 예외(st.rerun 포함)로 중단된 실행은 기록하지 않음
+        self.record(name, time.perf_counter() - start, page)
+
+    # 함수 실행 시간 측정 데코레이터 (비활성화 상태면 원래 함수를 그대로 반환)
+    def timed(self, name=None):
+        def decorator(func):
+            if not self.enabled:
+                return func
+            label = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.measure(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # 화면·구간별 통계: [{"page", "name", "count", "mean", "p50", "p95", "p99", "max"}, ...] (초 단위)
+    def snapshot(self):
+        with self._lock:
+            rows = []
+            for (page, name), histogram in sorted(self._histograms.items()):
+                rows.append({
+                    "page": page,
+                    "name": name,
+                    "count": histogram.count,
+                    "mean": histogram.total / histogram.count,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                    "max": histogram.max,
+                })
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
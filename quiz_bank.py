@@ -0,0 +1,44 @@
+import json
+import os
+
+# 퀴즈 문항 정의 (quiz_bank.json)
+# 사전/사후 퀴즈가 같은 문항을 사용하며, 섹션 단위로 구성됩니다.
+
+QUIZ_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_bank.json")
+
+
+def load_quiz_bank(path=QUIZ_BANK_PATH):
+    with open(path, encoding="utf-8") as f:
+        bank = json.load(f)
+    validate_quiz_bank(bank)
+    return bank
+
+
+# 문항 형식 검사 (잘못된 문항 파일은 앱 시작 시 바로 알 수 있도록 예외 발생)
+def validate_quiz_bank(bank):
+    sections = bank.get("sections")
+    if not sections:
+        raise ValueError("퀴즈 문항 파일에 섹션이 없습니다.")
+    seen_ids = set()
+    for section in sections:
+        if not section.get("title"):
+            raise ValueError("섹션 제목이 없습니다.")
+        if not section.get("questions"):
+            raise ValueError(f"'{section['title']}' 섹션에 문항이 없습니다.")
+        for question in section["questions"]:
+            question_id = question.get("id")
+            if not isinstance(question_id, int) or question_id in seen_ids:
+                raise ValueError(f"문항 ID가 없거나 중복되었습니다: {question_id}")
+            seen_ids.add(question_id)
+            options = question.get("options")
+            if not question.get("question") or not options:
+                raise ValueError(f"{question_id}번 문항에 질문 또는 보기가 없습니다.")
+            if not isinstance(question.get("correct"), int) or not 0 <= question["correct"] < len(options):
+                raise ValueError(f"{question_id}번 문항의 정답 번호가 보기 범위를 벗어났습니다.")
+            if not question.get("explanation"):
+                raise ValueError(f"{question_id}번 문항에 해설이 없습니다.")
+
+
+def iter_questions(bank):
+    for section in bank["sections"]:
+        yield from section["questions"]
@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+
+from event_log import iter_events, replay
+from store import ParticipantStore
+
+# 이벤트 로그로 참가자 상태 재구성
+# 사용법:
+#   python replay_events.py data/events                      # 요약 출력
+#   python replay_events.py data/events --participant <ID>   # 참가자 한 명의 상태 출력
+#   python replay_events.py data/events --restore data/restored.db   # 참가자 저장소로 복원
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이벤트 로그를 처음부터 재생하여 참가자 상태를 다시 만듭니다.")
+    parser.add_argument("log_dir", nargs="?", default=os.path.join("data", "events"), help="이벤트 로그 폴더 (기본값: data/events)")
+    parser.add_argument("--participant", help="상태를 출력할 참가자 ID")
+    parser.add_argument("--restore", help="재구성한 상태를 저장할 참가자 데이터베이스 파일")
+    args = parser.parse_args()
+
+    event_count = 0
+
+    def counted(events):
+        nonlocal event_count
+        for event in events:
+            event_count += 1
+            yield event
+
+    states = replay(counted(iter_events(args.log_dir)))
+
+    if args.participant:
+        state = states.get(args.participant)
+        if state is None:
+            parser.error(f"{args.participant} 참가자의 이벤트가 없습니다.")
+        print(json.dumps(state, ensure_ascii=False, indent=2))
+        return
+
+    if args.restore:
+        store = ParticipantStore(args.restore)
+        restored = 0
+        for participant_id, state in states.items():
+            if state["timestamp"] is None:
+                continue
+            store.save(participant_id, state)
+            restored += 1
+        store.close()
+        print(f"{restored}명의 참가자를 {args.restore}에 저장했습니다.")
+
+    print(
+        f"이벤트 {event_count}개, 참가자 {len(states)}명 "
+        f"(사전 퀴즈 완료 {sum(state['pre_quiz_completed'] for state in states.values())}명, "
+        f"사후 퀴즈 완료 {sum(state['post_quiz_completed'] for state in states.values())}명)"
+    )
+
+
+if __name__ == "__main__":
+    main()
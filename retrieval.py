@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+import tiktoken
+from pypdf import PdfReader
+
+# 동의서 PDF 검색 (RAG)
+# ingest.py가 미리 만든 벡터 파일을 읽어 질문과 관련된 문단을 찾습니다.
+# 인덱스는 진료과별 분할(shard)과 모든 환자에게 해당하는 공통 분할로 나뉘며,
+# 질문은 참가자의 수술 유형에 맞는 분할과 공통 분할에서만 검색합니다.
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# 분할 폴더의 현재 벡터·문단 파일 이름 (이 파일을 교체하는 것이 분할 갱신의 완료 시점)
+SHARD_FILE = "shard.json"
+CHUNKS_FILE = "consent_chunks.jsonl"
+VECTORS_FILE = "consent_vectors.npy"
+# 이전 형식의 FAISS 인덱스 파일 (더 이상 만들거나 읽지 않음)
+INDEX_FILE = "consent.faiss"
+GENERAL_SHARD = "general"
+
+
+# 문서가 속한 분할: 최상위 폴더 이름이 진료과 (예: 산부인과/hysterectomy.pdf), 최상위에 있는 문서는 공통
+def shard_of(source):
+    parts = os.path.normpath(source).split(os.sep)
+    return parts[0] if len(parts) > 1 else GENERAL_SHARD
+
+
+# PDF 페이지별 텍스트 추출: [(페이지 번호, 텍스트), ...]
+def extract_pages(path):
+    reader = PdfReader(path)
+    pages = []
+    for page_number, page in enumerate(reader.pages, start=1):
+        text = " ".join((page.extract_text() or "").split())
+        if text:
+            pages.append((page_number, text))
+    return pages
+
+
+# 토큰 수 기준으로 텍스트를 겹치는 구간으로 나누기
+def chunk_text(text, max_tokens=400, overlap=50, encoding_name="cl100k_base"):
+    encoding = tiktoken.get_encoding(encoding_name)
+    tokens = encoding.encode(text)
+    step = max_tokens - overlap
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+        if start + max_tokens >= len(tokens):
+            break
+    return chunks
+
+
+# 텍스트 임베딩 (코사인 유사도 검색을 위해 단위 벡터로 정규화)
+def embed_texts(client, texts, batch_size=100):
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        response = client.embedding(model=EMBEDDING_MODEL, input=texts[start:start + batch_size])
+        vectors.extend(item.embedding for item in response.data)
+    vectors = np.asarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+# 분할 하나의 벡터와 문단 정보 저장
+# 벡터는 .npy 파일 그대로 메모리 매핑하여 검색하므로, ingest.py가 바뀌지 않은 문단의 임베딩을 재사용할 때도 이 파일을 읽습니다.
+# 벡터와 문단은 매번 새 이름의 파일로 쓰고 마지막에 shard.json을 한 번에 교체하므로,
+# 실행 중인 앱이 새 벡터와 이전 문단을 짝지어 읽는 일이 없습니다.
+def write_index(vectors, chunks, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    generation = uuid.uuid4().hex[:12]
+    files = {"vectors": _generation_name(VECTORS_FILE, generation), "chunks": _generation_name(CHUNKS_FILE, generation)}
+    with open(os.path.join(output_dir, files["vectors"]), "wb") as f:
+        np.save(f, np.ascontiguousarray(vectors, dtype="float32"))
+    with open(os.path.join(output_dir, files["chunks"]), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+
+    shard_path = os.path.join(output_dir, SHARD_FILE)
+    with open(shard_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({**files, "count": len(chunks)}, f)
+    os.replace(shard_path + ".tmp", shard_path)
+
+    # 이전 파일 제거 (이미 열어 둔 프로세스는 계속 사용할 수 있음)
+    stale_prefixes = tuple(os.path.splitext(name)[0] for name in (VECTORS_FILE, CHUNKS_FILE))
+    for name in os.listdir(output_dir):
+        if (name == INDEX_FILE or name.startswith(stale_prefixes)) and name not in files.values():
+            os.remove(os.path.join(output_dir, name))
+
+
+def _generation_name(name, generation):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}-{generation}{ext}"
+
+
+# 분할 하나 읽기: (벡터, 문단 목록), 분할이 없거나 파일이 맞지 않으면 None
+# mmap_mode="r"이면 벡터 파일을 읽기 전용 메모리 매핑으로 열어 여러 프로세스가 운영체제의 같은 페이지 캐시를 공유합니다.
+def read_shard(shard_dir, mmap_mode="r"):
+    shard_path = os.path.join(shard_dir, SHARD_FILE)
+    for _ in range(3):
+        if not os.path.exists(shard_path):
+            return None
+        try:
+            with open(shard_path, encoding="utf-8") as f:
+                files = json.load(f)
+            vectors = np.load(os.path.join(shard_dir, files["vectors"]), mmap_mode=mmap_mode)
+            with open(os.path.join(shard_dir, files["chunks"]), encoding="utf-8") as f:
+                chunks = [json.loads(line) for line in f]
+        except FileNotFoundError:
+            # 읽는 사이에 새 파일로 교체되어 이전 파일이 지워졌으면 다시 읽음
+            continue
+        if len(vectors) != len(chunks) or len(chunks) != files["count"]:
+            return None
+        return vectors, chunks
+    return None
+
+
+class RetrievalIndex:
+    def __init__(self, vectors, chunks):
+        self.vectors = vectors
+        self.chunks = chunks
+
+    @classmethod
+    def load(cls, index_dir):
+        shard = read_shard(index_dir)
+        return cls(*shard) if shard is not None else None
+
+    # 질문 벡터와 가장 가까운 문단 top_k개 반환 (저장된 벡터는 단위 벡터이므로 내적이 코사인 유사도)
+    def search(self, vector, top_k=3, min_score=0.3):
+        if len(self.vectors) == 0:
+            return []
+        query = np.asarray(vector, dtype="float32").reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = self.vectors @ query
+        count = min(top_k, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        results = []
+        for chunk_id in top[np.argsort(-scores[top])]:
+            if scores[chunk_id] < min_score:
+                continue
+            results.append({**self.chunks[chunk_id], "score": float(scores[chunk_id])})
+        return results
+
+
+class ShardedRetrievalIndex:
+    # 분할은 처음 검색할 때 읽고, 최근에 사용한 max_resident개만 메모리에 유지
+    def __init__(self, index_dir, max_resident=3):
+        self.index_dir = index_dir
+        self.max_resident = max_resident
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def load(cls, index_dir, **kwargs):
+        sharded = cls(index_dir, **kwargs)
+        return sharded if sharded.shards() else None
+
+    def shards(self):
+        if not os.path.isdir(self.index_dir):
+            return []
+        return [
+            name for name in sorted(os.listdir(self.index_dir))
+            if os.path.exists(os.path.join(self.index_dir, name, SHARD_FILE))
+        ]
+
+    def _get(self, shard):
+        with self._lock:
+            index = self._resident.get(shard)
+            if index is not None:
+                self._resident.move_to_end(shard)
+                return index
+            index = RetrievalIndex.load(os.path.join(self.index_dir, shard))
+            if index is None:
+                return None
+            self._resident[shard] = index
+            self.loads += 1
+            while len(self._resident) > self.max_resident:
+                self._resident.popitem(last=False)
+                self.evictions += 1
+            return index
+
+    # 해당 진료과 분할과 공통 분할에서 검색하여 점수가 높은 top_k개 반환 (shard가 None이면 공통 분할만)
+    def search(self, vector, shard=None, top_k=3, min_score=0.3):
+        results = []
+        for name in dict.fromkeys(name for name in (shard, GENERAL_SHARD) if name):
+            index = self._get(name)
+            if index is not None:
+                results.extend(index.search(vector, top_k=top_k, min_score=min_score))
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:top_k]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": list(self._resident),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# LLM 호출 순서 관리 (프로세스 전체에서 공유)
+# 동시에 진행하는 호출 수를 제한하고, 기다리는 요청은 세션별로 돌아가며 하나씩 시작합니다 (가장 오래전에 시작한 세션부터).
+# 한 세션이 여러 요청을 보내도 다른 세션이 밀리지 않으며, 대기열이 가득 차면 새 요청을 바로 거절합니다.
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Ticket:
+    def __init__(self, scheduler, session_id):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.started_at = None
+        self.released = False
+        self._event = threading.Event()
+
+    # 시작되거나 취소될 때까지 최대 timeout초 대기 (시작 또는 취소되었으면 True)
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    # 대기 순서 (1부터, 이미 시작되었으면 0)
+    def position(self):
+        return self.scheduler._position(self)
+
+    # 시작까지 남은 예상 시간 (초)
+    def eta(self):
+        return self.scheduler._eta(self)
+
+    # 호출이 끝났거나 대기를 포기할 때 반드시 호출
+    def release(self):
+        self.scheduler._release(self)
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency=8, max_queue=50, max_per_session=2, service_time=5.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self._queues = OrderedDict()  # 세션 ID -> 대기 중인 Ticket (먼저 기다리기 시작한 세션부터)
+        # 세션 ID -> 마지막으로 호출을 시작한 순번 (오래전에 시작한 세션부터, 시작한 적이 없는 세션이 가장 먼저)
+        self._served = OrderedDict()
+        self._serial = 0
+        self._waiting = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        # 호출 1건의 평균 처리 시간 (지수 이동 평균, 예상 대기 시간 계산에 사용)
+        self.service_time = service_time
+        self.admitted = 0
+        self.rejected = 0
+        self.peak_waiting = 0
+
+    # 요청 등록 (대기열이 가득 찼거나 세션의 대기 요청이 너무 많으면 QueueFull)
+    def submit(self, session_id):
+        ticket = Ticket(self, session_id)
+        with self._lock:
+            queue = self._queues.get(session_id)
+            if self._waiting >= self.max_queue or (queue is not None and len(queue) >= self.max_per_session):
+                self.rejected += 1
+                raise QueueFull()
+            if queue is None:
+                queue = self._queues[session_id] = deque()
+            queue.append(ticket)
+            self._waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self._waiting)
+            self._dispatch()
+        return ticket
+
+    # 대기 중인 세션 중 가장 오래전에 호출을 시작한 세션 (같으면 먼저 기다리기 시작한 세션)
+    @staticmethod
+    def _next_session(sessions, served):
+        return min(sessions, key=lambda session_id: served.get(session_id, -1))
+
+    # 빈 자리만큼 세션을 돌아가며 하나씩 시작 (방금 시작한 세션은 기다리는 다른 세션 뒤로)
+    def _dispatch(self):
+        while self._running < self.max_concurrency and self._queues:
+            session_id = self._next_session(self._queues, self._served)
+            queue = self._queues[session_id]
+            ticket = queue.popleft()
+            if not queue:
+                del self._queues[session_id]
+            self._serial += 1
+            self._served[session_id] = self._serial
+            self._served.move_to_end(session_id)
+            # 오래된 기록은 버림 (버려진 세션은 시작한 적이 없는 세션처럼 가장 먼저 차례가 옴)
+            while len(self._served) > self.max_queue * 4:
+                self._served.popitem(last=False)
+            self._waiting -= 1
+            self._running += 1
+            self.admitted += 1
+            ticket.started_at = time.monotonic()
+            ticket._event.set()
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.started_at is None:
+                queue = self._queues.get(ticket.session_id)
+                if queue is not None and ticket in queue:
+                    queue.remove(ticket)
+                    self._waiting -= 1
+                    if not queue:
+                        del self._queues[ticket.session_id]
+                ticket._event.set()
+                return
+            self._running -= 1
+            self.service_time += 0.2 * (time.monotonic() - ticket.started_at - self.service_time)
+            self._dispatch()
+
+    # 앞선 대기 요청 수 + 1 (_dispatch와 같은 순서로 시작한다고 보고 이 요청 앞에 시작할 요청을 셈)
+    def _position(self, ticket):
+        with self._lock:
+            if ticket.started_at is not None or ticket.released:
+                return 0
+            queue = self._queues.get(ticket.session_id)
+            if queue is None or ticket not in queue:
+                return 0
+            rank = queue.index(ticket)
+            remaining = OrderedDict((session_id, len(other)) for session_id, other in self._queues.items())
+            served = dict(self._served)
+            serial = self._serial
+            ahead = 0
+            while True:
+                session_id = self._next_session(remaining, served)
+                if session_id == ticket.session_id:
+                    if rank == 0:
+                        return ahead + 1
+                    rank -= 1
+                remaining[session_id] -= 1
+                if not remaining[session_id]:
+                    del remaining[session_id]
+                serial += 1
+                served[session_id] = serial
+                ahead += 1
+
+    def _eta(self, ticket):
+        position = self._position(ticket)
+        if position == 0:
+            return 0.0
+        return -(-position // self.max_concurrency) * self.service_time
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._running,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "peak_waiting": self.peak_waiting,
+                "service_time": self.service_time,
+            }
@@ -0,0 +1,119 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+# 질문-답변 의미 캐시
+# 정규화된 질문이 같으면 바로 반환하고, 다르면 임베딩 유사도(FAISS 내적 검색)로 비슷한 질문을 찾습니다.
+
+
+# 질문 정규화 (대소문자, 문장부호, 공백 차이 제거)
+def normalize_prompt(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+# 코사인 유사도 계산을 위해 단위 벡터로 변환
+def to_unit_vector(embedding):
+    vector = np.asarray(embedding, dtype="float32").reshape(1, -1)
+    faiss.normalize_L2(vector)
+    return vector
+
+
+class SemanticCache:
+    def __init__(self, embed_fn, threshold=0.92, max_entries=1000, ttl=24 * 60 * 60):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # 정규화된 질문 -> (벡터 ID, 답변, 저장 시각)
+        self._keys_by_id = {}
+        self._index = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # 캐시 조회: (답변 또는 None, 질문 벡터) 반환
+    # 질문 벡터는 캐시에 없을 때 put()에 그대로 넘겨 임베딩을 다시 계산하지 않도록 합니다.
+    def get(self, prompt):
+        key = normalize_prompt(prompt)
+        with self._lock:
+            answer = self._lookup_exact(key)
+            if answer is not None:
+                self.hits += 1
+                return answer, None
+
+        vector = to_unit_vector(self.embed_fn(key))
+        with self._lock:
+            answer = self._lookup_similar(vector)
+            if answer is not None:
+                self.hits += 1
+                self.semantic_hits += 1
+            else:
+                self.misses += 1
+        return answer, vector
+
+    def put(self, prompt, answer, vector=None):
+        key = normalize_prompt(prompt)
+        if vector is None:
+            vector = to_unit_vector(self.embed_fn(key))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            vector_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([vector_id], dtype="int64"))
+            self._entries[key] = (vector_id, answer, time.time())
+            self._keys_by_id[vector_id] = key
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _expired(self, stored_at):
+        return time.time() - stored_at > self.ttl
+
+    def _lookup_exact(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[2]):
+            self._remove(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _lookup_similar(self, vector):
+        if self._index is None or self._index.ntotal == 0:
+            return None
+        scores, ids = self._index.search(vector, 1)
+        if ids[0][0] < 0 or scores[0][0] < self.threshold:
+            return None
+        return self._lookup_exact(self._keys_by_id[int(ids[0][0])])
+
+    def _remove(self, key):
+        vector_id = self._entries.pop(key)[0]
+        del self._keys_by_id[vector_id]
+        self._index.remove_ids(np.array([vector_id], dtype="int64"))
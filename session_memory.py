@@ -0,0 +1,94 @@
+import sys
+
+# 세션별 메모리 관리
+# 퀴즈 답변은 문항 수만큼의 bytearray에 담고, 세션 상태가 차지하는 메모리를 측정합니다.
+
+UNANSWERED = 0xFF
+
+
+class PackedAnswers:
+    __slots__ = ("_positions", "_values")
+
+    # 문항 ID 순서별 위치 표 (모든 세션이 같은 객체를 공유)
+    _layouts = {}
+
+    def __init__(self, question_ids):
+        question_ids = tuple(question_ids)
+        positions = self._layouts.get(question_ids)
+        if positions is None:
+            positions = self._layouts.setdefault(
+                question_ids,
+                {question_id: i for i, question_id in enumerate(question_ids)}
+            )
+        self._positions = positions
+        self._values = bytearray([UNANSWERED]) * len(question_ids)
+
+    # 선택한 보기 번호 (0부터 시작, 답하지 않았으면 None)
+    def get(self, question_id):
+        value = self._values[self._positions[question_id]]
+        return None if value == UNANSWERED else value
+
+    def set(self, question_id, option_index):
+        if not 0 <= option_index < UNANSWERED:
+            raise ValueError(f"보기 번호가 범위를 벗어났습니다: {option_index}")
+        self._values[self._positions[question_id]] = option_index
+
+    def answered_count(self):
+        return len(self._values) - self._values.count(UNANSWERED)
+
+    # 저장용 사전 형식: {"q1": 0, ...} (답한 문항만)
+    def to_dict(self, prefix):
+        return {
+            f"{prefix}{question_id}": self._values[position]
+            for question_id, position in self._positions.items()
+            if self._values[position] != UNANSWERED
+        }
+
+    # 세션 메모리 측정에서 제외할 공유 객체
+    @classmethod
+    def shared_objects(cls):
+        return list(cls._layouts.values())
+
+
+# 객체가 참조하는 모든 하위 객체를 포함한 크기 (같은 객체는 한 번만 계산)
+def deep_sizeof(obj, seen=None):
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        elif hasattr(type(current), "__slots__"):
+            stack.extend(getattr(current, slot) for slot in type(current).__slots__ if hasattr(current, slot))
+    return total
+
+
+# 세션 상태 목록의 메모리 사용량: 세션 수, 합계/평균/최대 바이트, 키별 합계
+def session_memory_report(states, shared=()):
+    shared_ids = {id(obj) for obj in shared}
+    sizes = []
+    by_key = {}
+    for state in states:
+        session_total = 0
+        for key, value in state.items():
+            size = sys.getsizeof(key) + deep_sizeof(value, set(shared_ids))
+            by_key[key] = by_key.get(key, 0) + size
+            session_total += size
+        sizes.append(session_total)
+    return {
+        "sessions": len(sizes),
+        "total": sum(sizes),
+        "mean": sum(sizes) / len(sizes) if sizes else 0,
+        "max": max(sizes) if sizes else 0,
+        "by_key": dict(sorted(by_key.items(), key=lambda item: item[1], reverse=True)),
+    }
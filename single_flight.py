@@ -0,0 +1,129 @@
+import threading
+
+# 동시에 들어온 같은 요청 합치기 (프로세스 전체에서 공유)
+# 같은 키의 요청이 진행 중이거나 대기 중이면 OpenAI를 다시 호출하지 않고, 그 응답의 토큰을 함께 받습니다.
+# 업스트림 호출은 별도 스레드에서 실행되므로 먼저 요청한 세션이 종료되어도 나머지 세션은 끝까지 응답을 받습니다.
+# 호출 슬롯(admit이 돌려주는 Ticket)도 이 스레드가 호출 직전에 기다리고 호출이 끝나면 놓으므로,
+# 보고 있던 세션이 다시 실행되거나 연결이 끊겨도 동시 호출 수 제한이 지켜집니다.
+
+
+class _Flight:
+    def __init__(self, ticket):
+        self.ticket = ticket
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.started = False
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+
+# 진행 중인 응답 하나를 받는 쪽 (반복하면 토큰을 차례로 돌려주며, 다 받았거나 그만 받을 때 close() 호출)
+class Subscription:
+    def __init__(self, coalescer, key, flight):
+        self._coalescer = coalescer
+        self._key = key
+        self._flight = flight
+        self._closed = False
+
+    # 업스트림 호출의 대기열 Ticket (대기열 없이 시작했으면 None)
+    @property
+    def ticket(self):
+        return self._flight.ticket
+
+    def __iter__(self):
+        return self._coalescer._follow(self._flight)
+
+    # 받는 쪽이 모두 떠났는데 아직 호출을 시작하지 않았으면 대기열에서 빼고 호출하지 않음
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._coalescer._leave(self._key, self._flight)
+
+
+class StreamCoalescer:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    # produce는 토큰을 차례로 돌려주는 함수 (같은 키로 진행 중인 요청이 없을 때만 호출)
+    # admit은 새 호출을 등록할 때만 호출되어 Ticket을 돌려주는 함수 (QueueFull 같은 예외는 그대로 전달)
+    def stream(self, key, produce, admit=None):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(admit() if admit is not None else None)
+                self._flights[key] = flight
+                threading.Thread(
+                    target=self._run, args=(key, flight, produce), name="chat-single-flight", daemon=True
+                ).start()
+            else:
+                self.coalesced += 1
+            flight.followers += 1
+        return Subscription(self, key, flight)
+
+    def _run(self, key, flight, produce):
+        try:
+            if flight.ticket is not None:
+                flight.ticket.wait()
+            with self._lock:
+                if flight.cancelled:
+                    return
+                flight.started = True
+                self.upstream_calls += 1
+            for token in produce():
+                with flight.condition:
+                    flight.tokens.append(token)
+                    flight.condition.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if flight.ticket is not None:
+                flight.ticket.release()
+            # 완료된 응답은 합치지 않음 (이후 같은 질문은 답변 캐시에서 처리)
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def _leave(self, key, flight):
+        ticket = None
+        with self._lock:
+            flight.followers -= 1
+            if flight.followers == 0 and not flight.started and not flight.cancelled:
+                flight.cancelled = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                ticket = flight.ticket
+        if ticket is not None:
+            ticket.release()
+
+    def _follow(self, flight):
+        position = 0
+        while True:
+            with flight.condition:
+                while position >= len(flight.tokens) and not flight.done:
+                    flight.condition.wait()
+                tokens = flight.tokens[position:]
+                done = flight.done
+            position += len(tokens)
+            yield from tokens
+            if done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    def stats(self):
+        with self._lock:
+            requests = self.upstream_calls + self.coalesced
+            return {
+                "in_flight": len(self._flights),
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "saved_ratio": self.coalesced / requests if requests else 0.0,
+            }
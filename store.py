@@ -0,0 +1,419 @@
+import atexit
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# 참가자 데이터 저장소 (SQLite, WAL 모드)
+# 여러 세션/프로세스가 같은 파일을 공유하며, 쓰기는 모아서 한 번에 처리합니다.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    updated_at TEXT,
+    age TEXT,
+    gender TEXT,
+    education TEXT,
+    medical_experience TEXT,
+    pre_quiz_answers TEXT NOT NULL DEFAULT '{}',
+    post_quiz_answers TEXT NOT NULL DEFAULT '{}',
+    pre_quiz_completed INTEGER NOT NULL DEFAULT 0,
+    post_quiz_completed INTEGER NOT NULL DEFAULT 0,
+    post_quiz_score REAL NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    participant_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_participant ON chat_messages(participant_id, id);
+CREATE TABLE IF NOT EXISTS store_counters (
+    name TEXT PRIMARY KEY,
+    value NUMERIC NOT NULL
+);
+INSERT OR IGNORE INTO store_counters (name, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS profile_histograms (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, value)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO participants (
+    id, timestamp, updated_at, age, gender, education, medical_experience,
+    pre_quiz_answers, post_quiz_answers,
+    pre_quiz_completed, post_quiz_completed, post_quiz_score, version
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    updated_at = excluded.updated_at,
+    version = excluded.version,
+    age = excluded.age,
+    gender = excluded.gender,
+    education = excluded.education,
+    medical_experience = excluded.medical_experience,
+    pre_quiz_answers = excluded.pre_quiz_answers,
+    post_quiz_answers = excluded.post_quiz_answers,
+    pre_quiz_completed = excluded.pre_quiz_completed,
+    post_quiz_completed = excluded.post_quiz_completed,
+    post_quiz_score = excluded.post_quiz_score
+"""
+
+INSERT_MESSAGE_SQL = """
+INSERT INTO chat_messages (participant_id, role, content, created_at) VALUES (?, ?, ?, ?)
+"""
+
+UPSERT_HISTOGRAM_SQL = """
+INSERT INTO profile_histograms (dimension, value, count) VALUES (?, ?, ?)
+ON CONFLICT(dimension, value) DO UPDATE SET count = count + excluded.count
+"""
+
+# 목록 필터로 사용할 수 있는 프로필 열 (대시보드 통계의 분포도 이 열별로 누적)
+PROFILE_COLUMNS = ("age", "gender", "education", "medical_experience")
+# 대시보드 통계 누적값 (store_counters에 저장)
+STAT_COUNTERS = ("participants", "completed_pre_quiz", "completed_post_quiz", "score_sum", "score_sq_sum")
+# 통계에 반영되는 참가자 열
+STAT_COLUMNS = PROFILE_COLUMNS + ("pre_quiz_completed", "post_quiz_completed", "post_quiz_score")
+MISSING_LABEL = "미입력"
+
+class ParticipantStore:
+    def __init__(self, path, batch_size=100, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        # 참가자 ID별 최신 기록 (같은 참가자의 연속 저장은 하나로 합쳐짐)
+        self._pending = {}
+        # 세션에서 밀려난 채팅 메시지 (도착 순서대로 기록)
+        self._pending_messages = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(participants)")}
+        if "updated_at" not in columns:
+            conn.execute("ALTER TABLE participants ADD COLUMN updated_at TEXT")
+        if "version" not in columns:
+            conn.execute("ALTER TABLE participants ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_participants_version ON participants(version)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_participants_timestamp ON participants(timestamp, id)")
+        conn.commit()
+
+        # 통계 누적값이 없는 DB(이전 버전)는 한 번만 전체를 집계해 채움 (여러 프로세스가 동시에 시작해도 한 번)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM store_counters WHERE name = 'participants'").fetchone() is None:
+                self._rebuild_stats(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        # 백그라운드 쓰기 스레드
+        self._writer = threading.Thread(target=self._run_writer, name="participant-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # 스레드마다 별도의 연결을 사용합니다 (sqlite3 연결은 스레드 간 공유 불가)
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # 참가자 기록 저장 (참가자 ID 기준 upsert, 실제 기록은 일괄 처리)
+    def save(self, participant_id, record):
+        profile = record.get("profile", {})
+        now = datetime.now()
+        row = (
+            participant_id,
+            record.get("timestamp") or now.strftime("%Y-%m-%d %H:%M:%S"),
+            now.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            profile.get("age"),
+            profile.get("gender"),
+            profile.get("education"),
+            profile.get("medical_experience"),
+            json.dumps(record.get("pre_quiz_answers", {}), ensure_ascii=False),
+            json.dumps(record.get("post_quiz_answers", {}), ensure_ascii=False),
+            int(bool(record.get("pre_quiz_completed", False))),
+            int(bool(record.get("post_quiz_completed", False))),
+            float(record.get("post_quiz_score", 0) or 0),
+        )
+        with self._lock:
+            self._pending.pop(participant_id, None)
+            self._pending[participant_id] = row
+            pending = len(self._pending)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    # 채팅 메시지 보관 (세션에 최근 메시지만 남기고 이전 메시지를 옮길 때 사용, 기록은 일괄 처리)
+    def append_messages(self, participant_id, messages):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(participant_id, message["role"], message["content"], now) for message in messages]
+        with self._lock:
+            self._pending_messages.extend(rows)
+            pending = len(self._pending) + len(self._pending_messages)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    # 대기 중인 쓰기를 하나의 트랜잭션으로 기록
+    # 참가자 기록에는 트랜잭션 안에서 올린 데이터 버전을 함께 기록합니다.
+    # 쓰기 트랜잭션은 프로세스와 관계없이 한 번에 하나씩 실행되므로, 나중에 커밋된 기록일수록 버전이 큽니다.
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = list(self._pending.values()), {}
+                messages, self._pending_messages = self._pending_messages, []
+            if not batch and not messages:
+                return 0
+            conn = self._connection()
+            with conn:
+                if batch:
+                    # 첫 문장이 쓰기이므로 여기서 쓰기 잠금을 얻고, 커밋할 때까지 다른 쓰기는 기다림
+                    conn.execute("UPDATE store_counters SET value = value + 1 WHERE name = 'version'")
+                    version = conn.execute("SELECT value FROM store_counters WHERE name = 'version'").fetchone()[0]
+                    counters, histograms = self._stats_deltas(conn, batch)
+                    conn.executemany(UPSERT_SQL, [row + (version,) for row in batch])
+                    conn.executemany(
+                        "UPDATE store_counters SET value = value + ? WHERE name = ?",
+                        [(delta, name) for name, delta in counters.items() if delta]
+                    )
+                    conn.executemany(
+                        UPSERT_HISTOGRAM_SQL,
+                        [(dimension, value, delta) for (dimension, value), delta in histograms.items() if delta]
+                    )
+                    conn.execute("DELETE FROM profile_histograms WHERE count <= 0")
+                if messages:
+                    conn.executemany(INSERT_MESSAGE_SQL, messages)
+            return len(batch) + len(messages)
+
+    # 기록할 참가자들의 통계 변화량: 이전 기록(있으면)을 빼고 새 기록을 더함 (쓰기 트랜잭션 안에서 호출)
+    def _stats_deltas(self, conn, batch):
+        counters = dict.fromkeys(STAT_COUNTERS, 0)
+        histograms = {}
+
+        def add(values, sign):
+            counters["participants"] += sign
+            for column, value in zip(PROFILE_COLUMNS, values):
+                key = (column, value or MISSING_LABEL)
+                histograms[key] = histograms.get(key, 0) + sign
+            pre_quiz_completed, post_quiz_completed, post_quiz_score = values[len(PROFILE_COLUMNS):]
+            if pre_quiz_completed:
+                counters["completed_pre_quiz"] += sign
+            if post_quiz_completed:
+                counters["completed_post_quiz"] += sign
+                counters["score_sum"] += sign * post_quiz_score
+                counters["score_sq_sum"] += sign * post_quiz_score * post_quiz_score
+
+        sql = f"SELECT {', '.join(STAT_COLUMNS)} FROM participants WHERE id = ?"
+        for row in batch:
+            old = conn.execute(sql, (row[0],)).fetchone()
+            if old is not None:
+                add(tuple(old), -1)
+            add(row[3:7] + row[9:12], 1)
+        return counters, histograms
+
+    # 저장된 참가자 전체로 통계 누적값을 다시 계산 (트랜잭션 안에서 호출)
+    def _rebuild_stats(self, conn):
+        totals = conn.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(pre_quiz_completed), 0),
+                   COALESCE(SUM(post_quiz_completed), 0),
+                   COALESCE(SUM(CASE WHEN post_quiz_completed THEN post_quiz_score END), 0),
+                   COALESCE(SUM(CASE WHEN post_quiz_completed THEN post_quiz_score * post_quiz_score END), 0)
+            FROM participants
+        """).fetchone()
+        conn.executemany(
+            "INSERT OR REPLACE INTO store_counters (name, value) VALUES (?, ?)", zip(STAT_COUNTERS, tuple(totals))
+        )
+        conn.execute("DELETE FROM profile_histograms")
+        for column in PROFILE_COLUMNS:
+            conn.execute(f"""
+                INSERT INTO profile_histograms (dimension, value, count)
+                SELECT ?, COALESCE(NULLIF({column}, ''), ?), COUNT(*) FROM participants GROUP BY 2
+            """, (column, MISSING_LABEL))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def _row_to_record(self, row):
+        return {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "updated_at": row["updated_at"],
+            "profile": {
+                "age": row["age"],
+                "gender": row["gender"],
+                "education": row["education"],
+                "medical_experience": row["medical_experience"],
+            },
+            "pre_quiz_answers": json.loads(row["pre_quiz_answers"]),
+            "post_quiz_answers": json.loads(row["post_quiz_answers"]),
+            "pre_quiz_completed": bool(row["pre_quiz_completed"]),
+            "post_quiz_completed": bool(row["post_quiz_completed"]),
+            "post_quiz_score": row["post_quiz_score"],
+        }
+
+    # 조회 전에 같은 프로세스의 대기 중인 쓰기를 반영
+    def _read(self, sql, params=()):
+        self.flush()
+        return self._connection().execute(sql, params)
+
+    # 전체 통계 (참가자 기록과 같은 트랜잭션에서 갱신되는 누적값만 읽으므로 참가자 수와 관계없이 일정한 시간)
+    # 반환값: 참가자 수, 사전/사후 완료 수, 사후 점수 평균과 표준편차, 프로필 열별 분포 {열: {값: 인원}}
+    def summary(self):
+        self.flush()
+        conn = self._connection()
+        # 누적값과 분포를 같은 시점의 데이터에서 읽음
+        conn.execute("BEGIN")
+        try:
+            counters = dict(conn.execute("SELECT name, value FROM store_counters").fetchall())
+            rows = conn.execute(
+                "SELECT dimension, value, count FROM profile_histograms ORDER BY dimension, count DESC, value"
+            ).fetchall()
+        finally:
+            conn.commit()
+        completed = int(counters.get("completed_post_quiz", 0))
+        avg_score = counters["score_sum"] / completed if completed else None
+        histograms = {column: {} for column in PROFILE_COLUMNS}
+        for row in rows:
+            histograms.setdefault(row["dimension"], {})[row["value"]] = row["count"]
+        return {
+            "total_users": int(counters.get("participants", 0)),
+            "completed_pre_quiz": int(counters.get("completed_pre_quiz", 0)),
+            "completed_post_quiz": completed,
+            "avg_score": avg_score,
+            "score_std": math.sqrt(max(counters["score_sq_sum"] / completed - avg_score ** 2, 0.0)) if completed else None,
+            "histograms": histograms,
+        }
+
+    # 데이터 버전 (참가자 기록을 쓸 때마다 증가, 바뀌면 집계 캐시를 다시 계산)
+    def data_version(self):
+        return self._read("SELECT value FROM store_counters WHERE name = 'version'").fetchone()[0]
+
+    def get(self, participant_id):
+        row = self._read("SELECT * FROM participants WHERE id = ?", (participant_id,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+    # 목록 한 페이지 조회 (최근 참가자부터, 키셋 페이지네이션)
+    # filters: {"since": 시작 시각, "until": 끝 시각, 프로필 열: [허용 값, ...]}
+    # before에 이전 페이지 마지막 기록의 (timestamp, id)를 주면 그 다음 페이지를 읽습니다.
+    # 반환값: (기록 목록, 다음 페이지 존재 여부)
+    def list_page(self, filters=None, page_size=20, before=None):
+        filters = filters or {}
+        conditions, params = [], []
+        if filters.get("since"):
+            conditions.append("timestamp >= ?")
+            params.append(filters["since"])
+        if filters.get("until"):
+            conditions.append("timestamp <= ?")
+            params.append(filters["until"])
+        for column in PROFILE_COLUMNS:
+            values = filters.get(column)
+            if values:
+                conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if before is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        sql = "SELECT * FROM participants"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(page_size + 1)
+        rows = self._read(sql, params).fetchall()
+        return [self._row_to_record(row) for row in rows[:page_size]], len(rows) > page_size
+
+    # ID 앞부분으로 참가자 찾기 (기본 키 인덱스 범위 검색)
+    def find_by_id_prefix(self, prefix, limit=10):
+        rows = self._read(
+            "SELECT * FROM participants WHERE id >= ? AND id < ? ORDER BY id LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit)
+        ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    # 보관된 채팅 메시지 (오래된 순, 대기 중인 메시지를 먼저 기록한 뒤 조회)
+    def messages(self, participant_id):
+        self.flush()
+        rows = self._read(
+            "SELECT role, content FROM chat_messages WHERE participant_id = ? ORDER BY id",
+            (participant_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # 기록 순회 (커서에서 chunk_size 단위로 읽어 메모리 사용량을 제한)
+    def iter_records(self, chunk_size=500):
+        cursor = self._read("SELECT * FROM participants ORDER BY timestamp, id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield self._row_to_record(row)
+
+    # 답변 행렬용 행 순회: (ID, 데이터 버전, 문항별 선택 번호..., 사전 완료, 사후 완료)를 chunk 단위로 반환
+    # 미응답은 -1이며, since를 주면 그 버전보다 나중에 기록된 참가자만 읽습니다.
+    def iter_answer_rows(self, pre_keys, post_keys, since=None, chunk_size=5000):
+        answer_columns, params = self._answer_columns(pre_keys, post_keys, missing=-1)
+        columns = ["id", "version"] + answer_columns + ["pre_quiz_completed", "post_quiz_completed"]
+        sql = f"SELECT {', '.join(columns)} FROM participants"
+        if since is not None:
+            sql += " WHERE version > ?"
+            params.append(since)
+        yield from self._iter_chunks(sql, params, chunk_size)
+
+    # 내보내기용 행 순회: (ID, 참여 시각, 나이, 성별, 교육수준, 수술 유형, 사전 완료, 사후 완료, 사후 점수,
+    # 사전 답변..., 사후 답변...)를 chunk 단위로 반환 (미응답은 None)
+    def iter_export_rows(self, pre_keys, post_keys, chunk_size=5000):
+        answer_columns, params = self._answer_columns(pre_keys, post_keys)
+        columns = ["id", "timestamp", *PROFILE_COLUMNS,
+                   "pre_quiz_completed", "post_quiz_completed", "post_quiz_score"] + answer_columns
+        sql = f"SELECT {', '.join(columns)} FROM participants ORDER BY timestamp, id"
+        yield from self._iter_chunks(sql, params, chunk_size)
+
+    # 문항별 답변 열 (JSON은 SQLite의 json_extract로 풀어 파이썬에서 기록을 하나씩 해석하지 않음)
+    def _answer_columns(self, pre_keys, post_keys, missing=None):
+        columns = ["json_extract(pre_quiz_answers, ?)" for _ in pre_keys]
+        columns += ["json_extract(post_quiz_answers, ?)" for _ in post_keys]
+        if missing is not None:
+            columns = [f"COALESCE({column}, {int(missing)})" for column in columns]
+        params = [f'$."{key}"' for key in list(pre_keys) + list(post_keys)]
+        return columns, params
+
+    def _iter_chunks(self, sql, params, chunk_size):
+        cursor = self._read(sql, params)
+        cursor.row_factory = None
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows